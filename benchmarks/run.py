@@ -0,0 +1,228 @@
+"""Бенчмарки генерации расписания с отслеживанием регрессий.
+
+    python -m benchmarks.run                  # сравнить с benchmarks/baseline.json
+    python -m benchmarks.run --save           # записать текущие результаты как baseline
+    python -m benchmarks.run --tolerance 0.3  # допустимое замедление относительно baseline (30%)
+
+Код возврата 1, если какая-либо метрика медленнее baseline больше чем на tolerance и больше,
+чем на абсолютный порог шума этой метрики (NOISE_FLOORS). При подозрении на регрессию прогон
+повторяется (--retries) и по каждой метрике берётся лучший результат: разовый шум машины не валит проверку.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import uuid
+from datetime import datetime
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DB_PATH = os.path.join(tempfile.gettempdir(), "schedule_benchmark.db")
+
+# Сквозной бенчмарк работает на SQLite, настройки задаются до импорта приложения
+os.environ.setdefault("DB_URL", f"sqlite+aiosqlite:///{DB_PATH}")
+for name, value in (("DB_USER", "bench"), ("DB_PASSWORD", "bench"), ("DB_HOST", "localhost"),
+                    ("DB_PORT", "5432"), ("DB_NAME", "bench")):
+    os.environ.setdefault(name, value)
+# Логи запросов сквозного бенчмарка и импортов в дочерних процессах не нужны в выводе
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from src.models import ScheduleCreate  # noqa: E402
+from src.repository.serialization import dumps  # noqa: E402
+from src.repository.utils import ScheduleGeneratorTimes, serialize_datetime  # noqa: E402
+
+PERIODICITIES = [1, 2, 4, 8, 12, 24]
+DURATIONS = [1, 30, 365, 3650]
+FIRST_TIME = datetime(2024, 3, 10, 9, 5)
+
+# Абсолютный шум замера, сек: замедление меньше порога не считается регрессией при любой доле.
+# Импорт в отдельном процессе и сквозные запросы шумят на миллисекунды, микробенчмарки - на микросекунды
+NOISE_FLOORS = {
+    "import_main": 0.05,
+    "import_server": 0.05,
+    "create_app": 0.005,
+    "post_schedule[p50]": 0.003,
+    "post_schedule[p99]": 0.02,
+}
+DEFAULT_NOISE_FLOOR = 25e-6
+
+
+def make_schedule(periodicity: int, duration_days: int, schedule_id: int = 1) -> ScheduleCreate:
+    return ScheduleCreate(first_time=FIRST_TIME, drug="benchmark", periodicity=periodicity,
+                          duration_days=duration_days, user_id=uuid.uuid4(), schedule_id=schedule_id)
+
+
+def best_of(func, repeat: int = 7) -> float:
+    # Минимальное время одного вызова, сек
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def bench_generation(results):
+    for periodicity in PERIODICITIES:
+        for duration_days in DURATIONS:
+            schedule = make_schedule(periodicity, duration_days)
+            results[f"generate[p={periodicity},d={duration_days}]"] = best_of(
+                lambda: ScheduleGeneratorTimes.generate_scheduled_times(schedule)
+            )
+
+    # Без кэша шаблонов: каждый вызов строит шаблон курса заново
+    for duration_days in (365, 3650):
+        schedule = make_schedule(1, duration_days)
+        results[f"generate_cold[p=1,d={duration_days}]"] = best_of(
+            lambda: (ScheduleGeneratorTimes.cached_course_template.cache_clear(),
+                     ScheduleGeneratorTimes.generate_dose_series(schedule))
+        )
+
+
+def bench_round_minute(results):
+    values = [FIRST_TIME.replace(hour=hour, minute=minute) for hour in range(24) for minute in range(0, 60, 7)]
+    results["round_minute[x216]"] = best_of(lambda: [ScheduleGeneratorTimes.round_minute(value) for value in values])
+
+
+def bench_serialization(results):
+    for duration_days in (30, 365):
+        schedule, last_day_times = ScheduleGeneratorTimes.generate_scheduled_times(make_schedule(1, duration_days))
+        results[f"serialize[p=1,d={duration_days}]"] = best_of(
+            lambda: (serialize_datetime(schedule), serialize_datetime(last_day_times))
+        )
+        results[f"orjson_dumps[p=1,d={duration_days}]"] = best_of(
+            lambda: dumps({"schedule": schedule, "last_day_times": last_day_times})
+        )
+
+
+async def _post_schedules(requests: int):
+    import httpx
+
+    from main import create_app
+
+    app = create_app()
+    latencies = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            for schedule_id in range(1, requests + 1):
+                payload = make_schedule(4, 30, schedule_id).model_dump(mode="json")
+                started = time.perf_counter()
+                response = await client.post("/schedule", json=payload)
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+    return sorted(latencies)
+
+
+def run_timed(code: str, repeat: int):
+    # Замеры из кода, выполненного в чистом процессе: минимум по repeat запускам для каждого значения
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+        timings.append([float(value) for value in output.split()[-2:]])
+    return [min(values) for values in zip(*timings)]
+
+
+def bench_import(results, repeat: int = 11):
+    # Время импорта и создания приложения в чистом процессе: так стартует каждый воркер
+    results["import_main"], results["create_app"] = run_timed(
+        "import time; started = time.perf_counter(); import main; imported = time.perf_counter(); "
+        "main.create_app(); print(imported - started, time.perf_counter() - imported)", repeat)
+    # Лаунчер src.server: главный процесс читает настройки и не импортирует приложение
+    results["import_server"], = run_timed(
+        "import time; started = time.perf_counter(); import src.server; print(time.perf_counter() - started)", repeat)
+
+
+def migrate_database():
+    # Приложение не создаёт таблицы само: схема накатывается миграциями
+    from alembic import command
+    from alembic.config import Config
+
+    from src.DB.database import ALEMBIC_INI
+    config = Config(ALEMBIC_INI)
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
+
+
+def bench_post_schedule(results, requests: int = 200):
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    migrate_database()
+    latencies = asyncio.run(_post_schedules(requests))
+    results["post_schedule[p50]"] = latencies[len(latencies) // 2]
+    results["post_schedule[p99]"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+
+
+def is_regression(name: str, value: float, reference: float, tolerance: float) -> bool:
+    return value / reference - 1 > tolerance and value - reference > NOISE_FLOORS.get(name, DEFAULT_NOISE_FLOOR)
+
+
+def has_regressions(results, baseline, tolerance: float) -> bool:
+    return any(name in baseline and is_regression(name, value, baseline[name], tolerance)
+               for name, value in results.items())
+
+
+def compare(results, baseline, tolerance: float) -> bool:
+    ok = True
+    print(f"{'benchmark':<32}{'current, ms':>14}{'baseline, ms':>14}{'change':>10}")
+    for name, value in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            print(f"{name:<32}{value * 1000:>14.4f}{'-':>14}{'new':>10}")
+            continue
+        change = value / reference - 1
+        regression = is_regression(name, value, reference, tolerance)
+        ok = ok and not regression
+        mark = "  REGRESSION" if regression else ""
+        print(f"{name:<32}{value * 1000:>14.4f}{reference * 1000:>14.4f}{change:>+10.1%}{mark}")
+    return ok
+
+
+def run_benchmarks(skip_e2e: bool):
+    results = {}
+    bench_generation(results)
+    bench_round_minute(results)
+    bench_serialization(results)
+    bench_import(results)
+    if not skip_e2e:
+        bench_post_schedule(results)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save", action="store_true", help="записать результаты в baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимое замедление, доля")
+    parser.add_argument("--retries", type=int, default=2, help="повторных прогонов при подозрении на регрессию")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="путь к JSON с baseline")
+    parser.add_argument("--skip-e2e", action="store_true", help="не запускать сквозной POST /schedule")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    results = run_benchmarks(args.skip_e2e)
+    for _ in range(args.retries):
+        if not has_regressions(results, baseline, args.tolerance):
+            break
+        print("Possible regression, re-running benchmarks", file=sys.stderr)
+        rerun = run_benchmarks(args.skip_e2e)
+        results = {name: min(value, rerun[name]) for name, value in results.items()}
+
+    ok = compare(results, baseline, args.tolerance)
+
+    if args.save:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,108 +1,464 @@
+import heapq
 import logging
+import uuid
 from contextlib import asynccontextmanager
+from datetime import date, datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from itertools import islice
+from typing import AsyncIterator, List, Optional
 
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from src.DB.ORM_models import UserOrm
+from fastapi import APIRouter, FastAPI, HTTPException, Depends, Header, Query, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
 
-from fastapi import FastAPI, HTTPException, Depends
-
-from src.DB.database import get_db, create_tables, delete_tables, new_session
+from src.config.config import Settings, get_settings
+from src.config.log import log_payload, setup_logging
+from src.DB.database import (check_schema, create_engine, create_session_factory, get_db, get_session_factory,
+                             register_pool_metrics)
 from src.models import SchemaScheduleCreate
-from src.repository.repository import TaskRepository
-from src.repository.utils import ScheduleGeneratorTimes, serialize_datetime
+from src.repository.repository import TaskRepository, get_repository
+from src.repository.cache import ScheduleCache, create_schedule_cache, get_schedule_cache
+from src.repository.metrics import (CONTENT_TYPE, DOSES_GENERATED, STAGE_LATENCY, CallbackGauge, MetricsMiddleware,
+                                    registry)
+from src.repository.offload import (GenerationPool, build_schedule_response, create_generation_pool,
+                                    encode_schedule_response, get_generation_pool)
+from src.repository.serialization import dumps, loads, iter_ndjson, encode_cursor, decode_cursor
+from src.repository.utils import DoseSeries, ScheduleGeneratorTimes
+from src.repository.write_queue import ScheduleWriteQueue, create_write_queue, get_write_queue
+
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-   await create_tables()
-   print("База готова")
-   yield
-   await delete_tables()
-   print("База очищена")
+   settings = app.state.settings
+   # Движок, пул соединений, кэш и очереди создаются при старте каждого воркера, а не при импорте
+   engine = create_engine(settings)
+   app.state.session_factory = create_session_factory(engine)
+   register_pool_metrics(engine)
+   try:
+       # Схема создаётся миграциями (alembic upgrade head), при старте только проверяется её версия
+       revision = await check_schema(engine)
+       logger.info("База готова", extra={"schema_revision": revision})
 
-app = FastAPI(lifespan=lifespan)
+       app.state.schedule_cache = create_schedule_cache(settings)
+       app.state.generation_pool = create_generation_pool(settings)
+       app.state.write_queue = create_write_queue(settings, app.state.session_factory, app.state.schedule_cache)
+       if app.state.write_queue is not None:
+           await app.state.write_queue.start()
+       yield
+       if app.state.write_queue is not None:
+           await app.state.write_queue.stop()
+       app.state.generation_pool.shutdown()
+   finally:
+       await engine.dispose()
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
 
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """Приложение с заданными настройками; без аргумента - настройки из окружения.
+
+    Импорт модуля ничего не создаёт: подключение к БД открывается в lifespan.
+    """
+    settings = settings if settings is not None else get_settings()
+
+    # Настройка логирования: JSON-записи, поля передаются через extra=
+    setup_logging(settings)
+
+    app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+    app.state.settings = settings
+    app.include_router(router)
+
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+    if settings.PROFILING_ENABLED:
+        # cProfile загружается только при включённом профилировании
+        from src.repository.profiling import ProfilingMiddleware
+        app.add_middleware(ProfilingMiddleware, header=settings.PROFILING_HEADER,
+                           sample_rate=settings.PROFILING_SAMPLE_RATE, directory=settings.PROFILING_DIR,
+                           max_files=settings.PROFILING_MAX_FILES, max_bytes=settings.PROFILING_MAX_BYTES)
 
-@app.post("/schedule")
-async def create_schedule(schedule_create: SchemaScheduleCreate, db: AsyncSession = Depends(get_db)):
-    logger.info("Received request to create schedule for user_id: %s", schedule_create.user_id)
+    registry.register(CallbackGauge("schedule_template_cache_hits", "Course template LRU cache hits",
+                                    lambda: ScheduleGeneratorTimes.template_cache_info()["hits"]))
+    registry.register(CallbackGauge("schedule_template_cache_misses", "Course template LRU cache misses",
+                                    lambda: ScheduleGeneratorTimes.template_cache_info()["misses"]))
+    return app
+
+
+def __getattr__(name: str):
+    # uvicorn main:app - приложение с настройками из окружения создаётся при первом обращении
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@router.post("/schedule")
+async def create_schedule(schedule_create: SchemaScheduleCreate, accept: Optional[str] = Header(None),
+                          db: AsyncSession = Depends(get_db), repository: TaskRepository = Depends(get_repository),
+                          cache: ScheduleCache = Depends(get_schedule_cache),
+                          queue: Optional[ScheduleWriteQueue] = Depends(get_write_queue),
+                          generation_pool: GenerationPool = Depends(get_generation_pool),
+                          session_factory: async_sessionmaker = Depends(get_session_factory)):
+    logger.info("Received request to create schedule", extra={"user_id": schedule_create.user_id})
+    stream = accept is not None and NDJSON_MEDIA_TYPE in accept
+    write_behind = queue is not None and not stream
+
+    # После начала потоковой выдачи статус ответа уже не изменить: занятый schedule_id проверяется заранее
+    if stream and await repository.get_existing_schedule_keys([(schedule_create.user_id,
+                                                                 schedule_create.schedule_id)]):
+        raise HTTPException(status_code=409, detail="Расписание с таким schedule_id уже существует")
 
     try:
-        # Генерация расписания для всех лекарств
-        schedule, last_day_times = ScheduleGeneratorTimes.generate_scheduled_times(schedule_create)
-        logger.info("Generated schedule: %s", schedule)
-
-        user = await TaskRepository.get_user(schedule_create.user_id)
-        logger.info("Fetched user: %s", user)
-
-        if user is None:
-            logger.warning("User not found for user_id: %s. Creating a new user.", schedule_create.user_id)
-            user = UserOrm(user_id=schedule_create.user_id)  # создаем нового пользователя
-            user.schedule = []  # Инициализируем расписание
-            user.last_day_times = []  # Инициализируем последние дни, если это необходимо
-
-        # Сериализуем расписание и последние дни
-        user.schedule.append(serialize_datetime(schedule))
-        user.last_day_times.extend(serialize_datetime(last_day_times))
-        logger.info("Updated user schedule and last day times.")
-
-        # Сохраните пользователя в базе данных
-        db.add(user)
-        await db.commit()
-        logger.info("Schedule saved successfully for user_id: %s", schedule_create.user_id)
+        # Генерация расписания; большие курсы считаются в пуле, ответ для них кодируется там же.
+        # При отложенной записи ответ 202 не содержит приёмов, поэтому кодировать их не нужно
+        with STAGE_LATENCY.time("generate"):
+            if stream or write_behind:
+                series = await generation_pool.run(ScheduleGeneratorTimes.generate_dose_series, schedule_create)
+            else:
+                series, payload = await generation_pool.run(build_schedule_response, schedule_create)
+        DOSES_GENERATED.observe(len(series))
+        logger.info("Generated schedule", extra={"user_id": schedule_create.user_id,
+                                                 "schedule_id": schedule_create.schedule_id, **series.summary()})
+        log_payload(logger, "Generated schedule payload", lambda: list(islice(series.iter_dicts(), 100)),
+                    user_id=schedule_create.user_id, schedule_id=schedule_create.schedule_id)
+
+        # Потоковая выдача: приёмы уходят клиенту порциями по мере вставки, сессия - своя,
+        # потому что зависимости закрываются до отправки тела ответа
+        if stream:
+            return StreamingResponse(stream_created_schedule(session_factory, cache, schedule_create, series),
+                                     media_type=NDJSON_MEDIA_TYPE)
+
+        # При отложенной записи назначение уходит в очередь, ответ не ждёт фиксации транзакции
+        if write_behind:
+            status_id = queue.submit(schedule_create, series)
+            if status_id is not None:
+                logger.info("Schedule queued", extra={"user_id": schedule_create.user_id,
+                                                      "schedule_id": schedule_create.schedule_id,
+                                                      "status_id": status_id})
+                return ORJSONResponse(
+                    {"message": "Schedule accepted", "schedule_id": schedule_create.schedule_id,
+                     "status_id": status_id,
+                     "status_url": f"/schedule/status/{status_id}?user_id={schedule_create.user_id}"
+                                   f"&schedule_id={schedule_create.schedule_id}"},
+                    status_code=202,
+                )
+            # Очередь переполнена: пишем синхронно, ответ кодируется здесь
+            payload = encode_schedule_response(series)
 
-        return {"message": "Schedule created successfully", "schedule": schedule, "last_day_times": last_day_times}
+        # Пользователь создаётся атомарно, если его ещё нет (параллельные запросы не конфликтуют по PK),
+        # версия его расписания увеличивается; приёмы пишутся одной пакетной вставкой
+        with STAGE_LATENCY.time("save"):
+            revisions = await repository.save_schedules([(schedule_create, series)])
+        with STAGE_LATENCY.time("commit"):
+            await db.commit()
+
+    except IntegrityError:
+        # schedule_id уже занят у этого пациента (уникальность (user_id, schedule_id))
+        await db.rollback()
+        logger.info("Schedule already exists", extra={"user_id": schedule_create.user_id,
+                                                      "schedule_id": schedule_create.schedule_id})
+        raise HTTPException(status_code=409, detail="Расписание с таким schedule_id уже существует")
 
     except Exception as e:
-        logger.exception("An error occurred while creating schedule for user_id: %s", schedule_create.user_id)
+        logger.exception("An error occurred while creating schedule", extra={"user_id": schedule_create.user_id})
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+    # Расписание зафиксировано: дальше ошибки не превращаются в 409/500, сброс кэша - по возможности
+    with STAGE_LATENCY.time("cache_invalidate"):
+        await cache.invalidate_revisions(revisions)
+    logger.info("Schedule saved", extra={"user_id": schedule_create.user_id,
+                                         "schedule_id": schedule_create.schedule_id})
+
+    # Ответ уже закодирован orjson, без jsonable_encoder
+    return Response(content=payload, media_type="application/json")
+
+
+async def stream_created_schedule(session_factory: async_sessionmaker, cache: ScheduleCache,
+                                  schedule_create: SchemaScheduleCreate, series: DoseSeries) -> AsyncIterator[bytes]:
+    # NDJSON: строки приёмов по мере вставки порций, последней строкой - итог записи:
+    # {"status": "saved", ...} после фиксации транзакции или {"status": "error", ...} после отката.
+    # Ответ без итоговой строки (обрыв соединения) означает, что расписание не сохранено
+    async with session_factory() as session:
+        repository = TaskRepository(session)
+        items = [(schedule_create, series)]
+        try:
+            revisions, prescription_ids = await repository.insert_schedules(items)
+            async for rows in repository.insert_dose_chunks(items, prescription_ids):
+                for line in iter_ndjson({"time": row["dose_at"], "drug_name": row["drug"], "user_id": row["user_id"]}
+                                        for row in rows):
+                    yield line
+            await session.commit()
+
+        except IntegrityError:
+            # schedule_id занят параллельным запросом после проверки в обработчике
+            await session.rollback()
+            logger.info("Schedule already exists", extra={"user_id": schedule_create.user_id,
+                                                          "schedule_id": schedule_create.schedule_id})
+            yield dumps({"status": "error", "schedule_id": schedule_create.schedule_id,
+                         "detail": "Schedule already exists"}) + b"\n"
+            return
+
+        except Exception:
+            await session.rollback()
+            logger.exception("An error occurred while streaming schedule", extra={"user_id": schedule_create.user_id})
+            yield dumps({"status": "error", "schedule_id": schedule_create.schedule_id,
+                         "detail": "Internal Server Error"}) + b"\n"
+            return
+
+    await cache.invalidate_revisions(revisions)
+    logger.info("Schedule saved", extra={"user_id": schedule_create.user_id,
+                                         "schedule_id": schedule_create.schedule_id})
+    yield dumps({"status": "saved", "schedule_id": schedule_create.schedule_id, "doses": len(series)}) + b"\n"
+
+
+@router.get("/schedule/status/{status_id}")
+async def get_schedule_status(status_id: str, user_id: Optional[uuid.UUID] = None, schedule_id: Optional[int] = None,
+                              repository: TaskRepository = Depends(get_repository),
+                              queue: Optional[ScheduleWriteQueue] = Depends(get_write_queue)):
+    status = queue.status(status_id) if queue is not None else None
+    if status is None:
+        # Назначение могло быть принято другим процессом: проверяем БД по (user_id, schedule_id) из status_url
+        if user_id is None or schedule_id is None or await repository.get_prescription(user_id, schedule_id) is None:
+            raise HTTPException(status_code=404, detail="Расписание не найдено")
+        status = "saved"
+
+    return {"status_id": status_id, "status": status}
+
+
+@router.post("/schedules/bulk")
+async def create_schedules_bulk(schedules: List[SchemaScheduleCreate], db: AsyncSession = Depends(get_db),
+                                repository: TaskRepository = Depends(get_repository),
+                                cache: ScheduleCache = Depends(get_schedule_cache),
+                                generation_pool: GenerationPool = Depends(get_generation_pool)):
+    logger.info("Received bulk request", extra={"schedules": len(schedules)})
+
+    results = []
+    items = []
+    # schedule_id уникален в пределах пациента: занятые в БД пары проверяются до вставки одним запросом
+    seen_keys = await repository.get_existing_schedule_keys(
+        (schedule_create.user_id, schedule_create.schedule_id) for schedule_create in schedules
+    )
+    existing_keys = set(seen_keys)
+
+    for schedule_create in schedules:
+        key = (schedule_create.user_id, schedule_create.schedule_id)
+        result = {"schedule_id": schedule_create.schedule_id, "user_id": schedule_create.user_id}
+        results.append(result)
+
+        if key in existing_keys:
+            result.update(status="error", detail="Schedule already exists")
+            continue
+        if key in seen_keys:
+            result.update(status="error", detail="Duplicate schedule_id in request")
+            continue
+
+        try:
+            series = await generation_pool.run(ScheduleGeneratorTimes.generate_dose_series, schedule_create)
+        except Exception:
+            logger.exception("Failed to generate schedule %s", schedule_create.schedule_id)
+            result.update(status="error", detail="Schedule generation failed")
+            continue
+
+        seen_keys.add(key)
+        items.append((schedule_create, series))
+        result.update(status="created", doses=len(series))
+
+    if not items:
+        return {"results": results}
+
+    try:
+        # Пользователи, назначения и приёмы пишутся пакетными вставками в одной транзакции
+        revisions = await repository.save_schedules(items)
+        await db.commit()
+
+    except IntegrityError:
+        # Пара (user_id, schedule_id) занята параллельным запросом после проверки
+        await db.rollback()
+        logger.info("Bulk schedules conflict with concurrent insert", extra={"schedules": len(items)})
+        raise HTTPException(status_code=409, detail="Расписание с таким schedule_id уже существует")
+
+    except Exception:
+        logger.exception("An error occurred while saving bulk schedules")
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
+    await cache.invalidate_revisions(revisions)
+    logger.info("Bulk schedules saved", extra={"schedules": len(items),
+                                               "doses": sum(len(series) for _, series in items)})
+    return {"results": results}
+
+
+@router.get("/schedule/{user_id}/day/{date}")
+async def get_day_schedule(user_id: uuid.UUID, date: date, repository: TaskRepository = Depends(get_repository)):
+    logger.info("Received request for day schedule", extra={"user_id": user_id, "date": date})
+
+    # Приёмы считаются по каждому назначению только для запрошенного дня
+    prescriptions = await repository.get_existing_schedule(user_id)
+    schedule = [
+        {"time": dose_time, "drug_name": prescription.drug, "user_id": user_id}
+        for prescription in prescriptions
+        for dose_time in ScheduleGeneratorTimes.generate_day_times(prescription, date)
+    ]
+    schedule.sort(key=lambda dose: dose["time"])
+
+    return ORJSONResponse({"date": date, "schedule": schedule})
+
+
+@router.get("/schedule/{user_id}/stream")
+async def stream_schedule(user_id: uuid.UUID, start: datetime, end: datetime,
+                          repository: TaskRepository = Depends(get_repository)):
+    logger.info("Received request to stream schedule", extra={"user_id": user_id, "start": start, "end": end})
+
+    # Приёмы генерируются лениво и сливаются по времени, в памяти только текущий приём каждого назначения
+    prescriptions = await repository.get_existing_schedule(user_id)
+    doses = heapq.merge(
+        *(ScheduleGeneratorTimes.iter_scheduled_times(prescription, start, end) for prescription in prescriptions),
+        key=lambda dose: dose["time"],
+    )
+
+    return StreamingResponse(iter_ndjson(doses), media_type=NDJSON_MEDIA_TYPE)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    # Метрики процесса в текстовом формате Prometheus; при нескольких воркерах каждый отдаёт свои
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
+
+
+@router.get("/cache/templates")
+async def get_template_cache_info():
+    # Попадания и промахи LRU-кэша шаблонов курса
+    return ScheduleGeneratorTimes.template_cache_info()
+
+
+def schedule_version_headers(revision: int, updated_at: Optional[datetime]):
+    headers = {"ETag": f'"{revision}"'}
+    if updated_at is not None:
+        if updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(updated_at.astimezone(timezone.utc), usegmt=True)
+    return headers
+
+
+def is_not_modified(revision: int, updated_at: Optional[datetime], if_none_match: Optional[str],
+                    if_modified_since: Optional[str]) -> bool:
+    # If-None-Match важнее If-Modified-Since (RFC 9110)
+    if if_none_match is not None:
+        tags = set()
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            tags.add(tag[2:] if tag.startswith("W/") else tag)
+        return "*" in tags or f'"{revision}"' in tags
+
+    if if_modified_since is None or updated_at is None:
+        return False
+    try:
+        modified_since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    return updated_at.replace(microsecond=0) <= modified_since
+
+
+async def get_schedule_version(user_id: uuid.UUID, repository: TaskRepository):
+    version = await repository.get_user_version(user_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+    return version
+
+
+async def get_cached_schedule_view(user_id: uuid.UUID, revision: int, repository: TaskRepository,
+                                   cache: ScheduleCache):
+    # Расписание пользователя из кэша; при промахе читается из БД и кэшируется в виде JSON
+    payload = await cache.get(user_id, revision)
+    if payload is None:
+        payload = dumps(await repository.get_schedule_view(user_id))
+        await cache.set(user_id, revision, payload)
+
+    return payload
+
+
+@router.get("/schedules")
+async def get_user_schedules(user_id: uuid.UUID, if_none_match: Optional[str] = Header(None),
+                             if_modified_since: Optional[str] = Header(None),
+                             repository: TaskRepository = Depends(get_repository),
+                             cache: ScheduleCache = Depends(get_schedule_cache)):
+    revision, updated_at = await get_schedule_version(user_id, repository)
+    headers = schedule_version_headers(revision, updated_at)
+    if is_not_modified(revision, updated_at, if_none_match, if_modified_since):
+        return Response(status_code=304, headers=headers)
+
+    payload = await get_cached_schedule_view(user_id, revision, repository, cache)
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+
+@router.get("/schedule")
+async def get_schedule(user_id: uuid.UUID, schedule_id: int, if_none_match: Optional[str] = Header(None),
+                       if_modified_since: Optional[str] = Header(None),
+                       repository: TaskRepository = Depends(get_repository),
+                       cache: ScheduleCache = Depends(get_schedule_cache)):
+    revision, updated_at = await get_schedule_version(user_id, repository)
+    headers = schedule_version_headers(revision, updated_at)
+    if is_not_modified(revision, updated_at, if_none_match, if_modified_since):
+        return Response(status_code=304, headers=headers)
+
+    view = loads(await get_cached_schedule_view(user_id, revision, repository, cache))
+
+    schedule = next((schedule for schedule in view["schedules"] if schedule["schedule_id"] == schedule_id), None)
+    if not schedule:
+        raise HTTPException(status_code=404, detail="Расписание не найдено")
+
+    return ORJSONResponse({"schedule": schedule}, headers=headers)
+
+
+@router.get("/users/{user_id}/doses")
+async def get_user_doses(user_id: uuid.UUID, after: Optional[str] = None, limit: int = Query(100, ge=1, le=1000),
+                         repository: TaskRepository = Depends(get_repository)):
+    try:
+        position = decode_cursor(after) if after is not None else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+    # Лишняя запись показывает, есть ли следующая страница
+    doses = await repository.get_doses_page(user_id, position, limit + 1)
+    page = doses[:limit]
+    next_cursor = encode_cursor(page[-1][0].dose_at, page[-1][0].id) if len(doses) > limit else None
+
+    return ORJSONResponse({
+        "doses": [
+            {"id": dose.id, "time": dose.dose_at, "drug_name": dose.drug, "schedule_id": schedule_id}
+            for dose, schedule_id in page
+        ],
+        "next_cursor": next_cursor,
+    })
+
+
+@router.get("/next_takings")
+async def get_next_takings(user_id: uuid.UUID, limit: int = Query(10, ge=1, le=100),
+                           repository: TaskRepository = Depends(get_repository)):
+    # Назначения читаются по индексу schedule(user_id), приёмы не генерируются целиком
+    prescriptions = await repository.get_existing_schedule(user_id)
+    if not prescriptions and await repository.get_user(user_id) is None:
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+
+    takings = ScheduleGeneratorTimes.next_takings(prescriptions, datetime.now(timezone.utc), limit)
+    return ORJSONResponse({"user_id": user_id, "next_takings": takings})
+
 
-# @app.get("/schedules")
-# def get_user_schedules(user_id: uuid.UUID, db: Session = Depends(get_db)):
-#     schedules = get_user_schedules(user_id, db)
-#     return {"schedules": schedules}
-#
-#
-# @app.get("/schedule")
-# def get_schedule(user_id: uuid.UUID, schedule_id: int, db: Session = Depends(get_db)):
-#     stmt = select(UserOrm).filter(UserOrm.user_id == user_id)
-#     user = db.execute(stmt).scalars().first()
-#
-#     if not user:
-#         raise HTTPException(status_code=404, detail="Пользователь не найден")
-#
-#     schedule = next((drug for drug in user.drugs if drug.id == schedule_id), None)
-#     if not schedule:
-#         raise HTTPException(status_code=404, detail="Расписание не найдено")
-#
-#         # Генерация расписания для данного лекарства
-#     scheduled_times, _ = ScheduleGeneratorTimes.generate_scheduled_times(
-#         schedule, user.first_time
-#     )
-#
-#     return {
-#         "schedule": {
-#             "schedule_id": schedule.id,
-#             "drug": schedule.drug,
-#             "scheduled_times": scheduled_times
-#         }
-#     }
-#
-# @app.get("/next_takings")
-# def get_next_takings(user_id: uuid.UUID, db: Session = Depends(get_db)):
-#     return get_next_schedule(user_id, db)
-
-@app.get("/")
+@router.get("/")
 async def read_root():
     return {"Hello": "World"}
 
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="127.0.0.1", port=8001, log_level="info")
+    # Production-запуск с несколькими воркерами: python -m src.server
+    from src.server import main
+    main()
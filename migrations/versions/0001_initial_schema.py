@@ -0,0 +1,73 @@
+"""initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 10:26:37.908613
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('users',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('schedule', sa.JSON(), nullable=True),
+    sa.Column('last_day_times', sa.JSON(), nullable=True),
+    sa.Column('revision', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('drugs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('drug', sa.String(), nullable=False),
+    sa.Column('periodicity', sa.Integer(), nullable=False),
+    sa.Column('duration_days', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_drugs_id'), 'drugs', ['id'], unique=False)
+    op.create_table('schedule',
+    sa.Column('schedule_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('first_time', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('drug', sa.String(), nullable=False),
+    sa.Column('periodicity', sa.Integer(), nullable=False),
+    sa.Column('duration_days', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('schedule_id')
+    )
+    op.create_index(op.f('ix_schedule_schedule_id'), 'schedule', ['schedule_id'], unique=False)
+    op.create_index(op.f('ix_schedule_user_id'), 'schedule', ['user_id'], unique=False)
+    op.create_table('doses',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('schedule_id', sa.Integer(), nullable=False),
+    sa.Column('drug', sa.String(), nullable=False),
+    sa.Column('dose_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['schedule_id'], ['schedule.schedule_id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_doses_user_id_dose_at', 'doses', ['user_id', 'dose_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_doses_user_id_dose_at', table_name='doses')
+    op.drop_table('doses')
+    op.drop_index(op.f('ix_schedule_user_id'), table_name='schedule')
+    op.drop_index(op.f('ix_schedule_schedule_id'), table_name='schedule')
+    op.drop_table('schedule')
+    op.drop_index(op.f('ix_drugs_id'), table_name='drugs')
+    op.drop_table('drugs')
+    op.drop_table('users')
@@ -0,0 +1,74 @@
+"""schedule surrogate key, schedule_id unique per user
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:05:11.402317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Имена ограничений, созданных в 0001 без явного имени: так их называет PostgreSQL,
+# для SQLite те же имена задаются через naming_convention пакетного режима
+NAMING_CONVENTION = {
+    "pk": "%(table_name)s_pkey",
+    "fk": "%(table_name)s_%(column_0_name)s_fkey",
+}
+
+
+def upgrade() -> None:
+    # schedule_id задаёт клиент: первичным ключом становится суррогатный schedule.id,
+    # уникальна только пара (user_id, schedule_id)
+    with op.batch_alter_table('doses', naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint('doses_schedule_id_fkey', type_='foreignkey')
+
+    with op.batch_alter_table('schedule', naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_index('ix_schedule_schedule_id')
+        batch_op.drop_index('ix_schedule_user_id')
+        batch_op.drop_constraint('schedule_pkey', type_='primary')
+        batch_op.alter_column('schedule_id', existing_type=sa.Integer(), server_default=None, nullable=False)
+        batch_op.alter_column('user_id', existing_type=sa.UUID(), nullable=False)
+        # Существующие строки получают значения из последовательности (в SQLite - rowid)
+        batch_op.add_column(sa.Column('id', sa.Integer(), sa.Identity(), nullable=False))
+        batch_op.create_primary_key('schedule_pkey', ['id'])
+        batch_op.create_unique_constraint('uq_schedule_user_id_schedule_id', ['user_id', 'schedule_id'])
+
+    # До этой миграции schedule_id был глобально уникален, поэтому сопоставление однозначно
+    op.execute(
+        "UPDATE doses SET schedule_id = "
+        "(SELECT schedule.id FROM schedule WHERE schedule.schedule_id = doses.schedule_id)"
+    )
+    with op.batch_alter_table('doses', naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.create_foreign_key('doses_schedule_id_fkey', 'schedule', ['schedule_id'], ['id'])
+
+
+def downgrade() -> None:
+    # Обратный переход возможен, только если schedule_id глобально уникален
+    with op.batch_alter_table('doses', naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint('doses_schedule_id_fkey', type_='foreignkey')
+
+    op.execute(
+        "UPDATE doses SET schedule_id = "
+        "(SELECT schedule.schedule_id FROM schedule WHERE schedule.id = doses.schedule_id)"
+    )
+
+    with op.batch_alter_table('schedule', naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint('uq_schedule_user_id_schedule_id', type_='unique')
+        batch_op.drop_constraint('schedule_pkey', type_='primary')
+        batch_op.drop_column('id')
+        batch_op.create_primary_key('schedule_pkey', ['schedule_id'])
+        batch_op.alter_column('user_id', existing_type=sa.UUID(), nullable=True)
+        batch_op.create_index('ix_schedule_user_id', ['user_id'], unique=False)
+        batch_op.create_index('ix_schedule_schedule_id', ['schedule_id'], unique=False)
+
+    with op.batch_alter_table('doses', naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.create_foreign_key('doses_schedule_id_fkey', 'schedule', ['schedule_id'], ['schedule_id'])
@@ -0,0 +1,30 @@
+"""schedule patient utc offset
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 14:20:37.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Смещение пациента от UTC в минутах: first_time хранится как его настенное время.
+    # У ранее сохранённых назначений смещение неизвестно, они считаются назначениями в UTC
+    with op.batch_alter_table('schedule') as batch_op:
+        batch_op.add_column(sa.Column('utc_offset_minutes', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('schedule') as batch_op:
+        batch_op.drop_column('utc_offset_minutes')
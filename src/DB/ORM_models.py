@@ -1,7 +1,7 @@
 import uuid
 from typing import List, Optional, Union, Dict
 
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, UUID, JSON
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, UUID, JSON, Index, UniqueConstraint
 from sqlalchemy.orm import relationship, DeclarativeBase, Mapped, mapped_column, declarative_base
 from datetime import datetime, timezone
 
@@ -17,14 +17,20 @@ class UserOrm(Model):
 
     user_id: Mapped[uuid.UUID] = mapped_column(UUID, primary_key=True, default=uuid.uuid4)
     drugs: Mapped[List["DrugOrm"]] = relationship("DrugOrm", back_populates="user", lazy='joined')
-    schedule: Mapped[List[List[Dict[str, Union[str, datetime]]]]] = mapped_column(JSON, default=[])
-    last_day_times: Mapped[List[Optional[datetime]]] = mapped_column(JSON, default=[])
+    # Устаревшие JSON-колонки: приёмы хранятся в таблице doses, расписание строится из неё
+    schedule: Mapped[Optional[List[List[Dict[str, Union[str, datetime]]]]]] = mapped_column(JSON, nullable=True)
+    last_day_times: Mapped[Optional[List[Optional[datetime]]]] = mapped_column(JSON, nullable=True)
+    # Версия расписания: увеличивается при каждой записи, используется для ETag/Last-Modified
+    revision: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
 
     def model_dump(self):
         return {
             "user_id": self.user_id,
             "schedule": self.schedule,
             "last_day_times": self.last_day_times,
+            "revision": self.revision,
+            "updated_at": self.updated_at,
         }
 
 class DrugOrm(Model):
@@ -57,20 +63,53 @@ class DrugOrm(Model):
 
 class ScheduleCreateORM(Model):
     __tablename__ = 'schedule'
+    __table_args__ = (
+        # schedule_id задаёт клиент, он уникален только в пределах пациента
+        UniqueConstraint('user_id', 'schedule_id', name='uq_schedule_user_id_schedule_id'),
+    )
 
-    schedule_id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    schedule_id: Mapped[int] = mapped_column(Integer, nullable=False)
     first_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.now(timezone.utc))
     drug: Mapped[str] = mapped_column(String, nullable=False)
     periodicity: Mapped[int] = mapped_column(Integer, nullable=False)
     duration_days: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
-    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey('users.user_id'))
+    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey('users.user_id'), nullable=False)
+    # first_time - настенное время пациента с меткой UTC; смещение нужно, чтобы сравнивать приёмы с текущим временем
+    utc_offset_minutes: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
 
     def model_dump(self):
         return {
             "id": self.id,
+            "schedule_id": self.schedule_id,
             "first_time": self.first_time,
             "drug": self.drug,
             "periodicity": self.periodicity,
             "duration_days": self.duration_days,
             "user_id": self.user_id,
-        }
\ No newline at end of file
+            "utc_offset_minutes": self.utc_offset_minutes,
+        }
+
+
+class DoseOrm(Model):
+    __tablename__ = 'doses'
+    __table_args__ = (
+        # Диапазонное чтение по времени и постраничная выдача по ключу (dose_at, id)
+        Index('ix_doses_user_id_dose_at', 'user_id', 'dose_at', 'id'),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID, ForeignKey('users.user_id'), nullable=False)
+    # Ссылка на суррогатный ключ schedule.id, клиентский schedule_id берётся из schedule
+    schedule_id: Mapped[int] = mapped_column(Integer, ForeignKey('schedule.id'), nullable=False)
+    drug: Mapped[str] = mapped_column(String, nullable=False)
+    dose_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    def model_dump(self):
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "schedule_id": self.schedule_id,
+            "drug": self.drug,
+            "dose_at": self.dose_at,
+        }
@@ -1,20 +1,72 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine, AsyncSession
-from src.DB.ORM_models import Model
-from src.config.config import settings
+import os
 
-DATABASE_URL = settings.get_db_url()
-engine = create_async_engine(DATABASE_URL, future=True, echo=True)
-new_session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine, AsyncSession
+from src.repository.metrics import CallbackGauge, registry
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "alembic.ini")
+
+
+def create_engine(settings) -> AsyncEngine:
+    # Движок создаётся в lifespan каждого процесса-воркера: пул соединений не наследуется через fork
+    return create_async_engine(settings.get_db_url(), future=True, **settings.get_engine_options())
+
+
+def create_session_factory(engine: AsyncEngine) -> async_sessionmaker:
+    return async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+
+def register_pool_metrics(engine: AsyncEngine):
+    def pool_stat(name: str) -> int:
+        # У NullPool нет счётчиков: соединения не переиспользуются
+        stat = getattr(engine.pool, name, None)
+        return stat() if stat is not None else 0
+
+    registry.register(CallbackGauge("db_pool_size", "Configured connection pool size",
+                                    lambda: pool_stat("size")))
+    registry.register(CallbackGauge("db_pool_connections_in_use", "Connections checked out of the pool",
+                                    lambda: pool_stat("checkedout")))
+    registry.register(CallbackGauge("db_pool_connections_idle", "Idle connections in the pool",
+                                    lambda: pool_stat("checkedin")))
+    # overflow() отрицателен, пока пул не заполнен
+    registry.register(CallbackGauge("db_pool_overflow", "Connections opened above pool_size",
+                                    lambda: max(pool_stat("overflow"), 0)))
 
 # Generator to get database sessions
-async def get_db():
-    async with new_session() as db:
+async def get_db(request: Request):
+    async with request.app.state.session_factory() as db:
         yield db
 
-async def create_tables():
-    async with engine.begin() as connection:
-        await connection.run_sync(Model.metadata.create_all)
 
-async def delete_tables():
-    async with engine.begin() as connection:
-        await connection.run_sync(Model.metadata.drop_all)
\ No newline at end of file
+# Фабрика сессий для кода, который работает с БД после выхода из зависимостей (потоковые ответы)
+def get_session_factory(request: Request) -> async_sessionmaker:
+    return request.app.state.session_factory
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+
+def get_head_revision() -> str:
+    # Последняя миграция из migrations/versions, без подключения к БД
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+    return ScriptDirectory.from_config(Config(ALEMBIC_INI)).get_current_head()
+
+
+async def check_schema(engine: AsyncEngine):
+    """Сверяет версию схемы в БД с последней миграцией; схему не меняет.
+
+    Миграции применяются отдельно (alembic upgrade head) до запуска воркеров.
+    """
+    from alembic.migration import MigrationContext
+
+    async with engine.connect() as connection:
+        current = await connection.run_sync(
+            lambda sync_connection: MigrationContext.configure(sync_connection).get_current_revision()
+        )
+    head = get_head_revision()
+    if current != head:
+        raise SchemaVersionError(
+            f"Версия схемы БД {current!r} не совпадает с последней миграцией {head!r}: выполните alembic upgrade head"
+        )
+    return current
@@ -1,13 +1,13 @@
 import os
+import uuid
+from functools import lru_cache
+from typing import Literal, Optional
 
-from pydantic import ValidationError
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from dotenv import load_dotenv
 
-__all__ = ['Settings', 'settings']
-
-load_dotenv()
+__all__ = ['Settings', 'get_settings']
 
 class Settings(BaseSettings):
     DB_USER: str
@@ -15,17 +15,109 @@ class Settings(BaseSettings):
     DB_HOST: str
     DB_PORT: int
     DB_NAME: str
+    DB_URL: Optional[str] = None  # Полный URL базы, переопределяет DB_* (например, SQLite для бенчмарков)
+
+    # Настройки движка и пула соединений
+    DB_ECHO: bool = False  # Логирование SQL, только для отладки
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # Ожидание свободного соединения, сек
+    DB_POOL_RECYCLE: int = 1800  # Пересоздание соединений старше N сек, -1 - не пересоздавать
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100  # Кэш подготовленных выражений asyncpg
+    # За PgBouncer (transaction pooling) пул держит PgBouncer: DB_USE_NULL_POOL=true и DB_STATEMENT_CACHE_SIZE=0.
+    # В этом режиме подготовленные выражения получают уникальные имена и не кэшируются драйвером SQLAlchemy
+    DB_USE_NULL_POOL: bool = False
+
+    # Кэш расписаний для эндпоинтов чтения
+    SCHEDULE_CACHE_TTL: float = 60.0  # сек
+    SCHEDULE_CACHE_MAXSIZE: int = 10000  # Пользователей в кэше процесса
+    SCHEDULE_CACHE_URL: Optional[str] = None  # redis://... - общий кэш вместо кэша в памяти процесса
+
+    # Отложенная запись расписаний: POST /schedule отвечает 202, запись идёт пачками в фоне
+    WRITE_BEHIND_ENABLED: bool = False
+    WRITE_BEHIND_WORKERS: int = 2
+    WRITE_BEHIND_BATCH_SIZE: int = 100  # Назначений в одной транзакции
+    WRITE_BEHIND_QUEUE_SIZE: int = 10000  # При переполнении запись идёт синхронно
+
+    # Генерация больших курсов вне event loop
+    GENERATION_OFFLOAD_THRESHOLD: int = 20000  # Приёмов в курсе, начиная с которых генерация уходит в пул
+    GENERATION_POOL_SIZE: int = 2
+    GENERATION_POOL_KIND: Literal["process", "thread"] = "process"
+
+    # Логирование
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: Literal["json", "text"] = "json"
+    LOG_PAYLOAD_SAMPLE_RATE: float = 0.0  # Доля запросов, для которых на DEBUG пишется всё расписание
+    LOG_PAYLOAD_MAX_CHARS: int = 4096
+
+    # Метрики: GET /metrics и гистограммы длительности запросов по маршрутам
+    METRICS_ENABLED: bool = True
+
+    # Профилирование отдельных запросов (cProfile), выключено по умолчанию
+    PROFILING_ENABLED: bool = False
+    PROFILING_HEADER: str = "X-Profile"  # Запрос с этим заголовком профилируется
+    PROFILING_SAMPLE_RATE: float = 0.0  # Доля запросов, профилируемых без заголовка
+    PROFILING_DIR: str = "profiles"
+    PROFILING_MAX_FILES: int = 100
+    PROFILING_MAX_BYTES: int = 100 * 1024 * 1024
+
+    # Запуск сервера (python -m src.server)
+    SERVER_HOST: str = "127.0.0.1"  # 0.0.0.0 - принимать соединения со всех интерфейсов
+    SERVER_PORT: int = 8001
+    SERVER_WORKERS: Optional[int] = None  # None - по числу доступных CPU
+    SERVER_BACKLOG: int = 2048  # Очередь ещё не принятых соединений
+    SERVER_KEEP_ALIVE: int = 5  # Простой keep-alive соединения, сек
+    SERVER_LIMIT_CONCURRENCY: Optional[int] = None  # Соединений на воркер, сверх - 503
+    SERVER_GRACEFUL_SHUTDOWN_TIMEOUT: Optional[int] = 30  # сек
+    SERVER_ACCESS_LOG: bool = False  # Длительность запросов есть в /metrics
 
     model_config = SettingsConfigDict(
         env_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
     )
 
     def get_db_url(self):
+        if self.DB_URL:
+            return self.DB_URL
         return (f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}@"
                 f"{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}")
 
-try:
-    settings = Settings()
-except ValidationError as e:
-    print(f"Validation errors: {e}")
-    exit(1)
\ No newline at end of file
+    def get_engine_options(self):
+        options = {
+            "echo": self.DB_ECHO,
+            "pool_pre_ping": self.DB_POOL_PRE_PING,
+        }
+        if self.get_db_url().startswith("postgresql+asyncpg"):
+            connect_args = {"statement_cache_size": self.DB_STATEMENT_CACHE_SIZE}
+            if self.DB_USE_NULL_POOL:
+                # asyncpg всё равно готовит именованные выражения; за PgBouncer соединение с сервером
+                # меняется между транзакциями, и повтор имени даёт "prepared statement already exists"
+                connect_args.update(prepared_statement_cache_size=0,
+                                    prepared_statement_name_func=unique_statement_name)
+            options["connect_args"] = connect_args
+        if self.DB_USE_NULL_POOL:
+            # Импорт здесь: config читают и процессы без БД (лаунчер src.server), им sqlalchemy не нужен
+            from sqlalchemy.pool import NullPool
+            options["poolclass"] = NullPool
+        else:
+            options.update(
+                pool_size=self.DB_POOL_SIZE,
+                max_overflow=self.DB_MAX_OVERFLOW,
+                pool_timeout=self.DB_POOL_TIMEOUT,
+                pool_recycle=self.DB_POOL_RECYCLE,
+            )
+        return options
+
+
+def unique_statement_name() -> str:
+    return f"__asyncpg_{uuid.uuid4()}__"
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """Настройки из окружения (и .env), читаются при первом обращении, а не при импорте.
+
+    При ошибке валидации выбрасывает pydantic.ValidationError.
+    """
+    load_dotenv()
+    return Settings()
@@ -0,0 +1,76 @@
+import logging
+import random
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict
+
+import orjson
+
+__all__ = ['JsonFormatter', 'TextFormatter', 'setup_logging', 'log_payload']
+
+# Стандартные атрибуты LogRecord; всё остальное пришло через extra= и попадает в JSON отдельными полями
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "color_message"}
+
+_payload_sample_rate = 0.0
+_payload_max_chars = 4096
+
+
+def _record_extras(record: logging.LogRecord) -> Dict[str, Any]:
+    return {key: value for key, value in record.__dict__.items()
+            if key not in _RECORD_ATTRS and not key.startswith("_")}
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись: время, уровень, логгер, сообщение и поля из extra="""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),  # Форматирование только для записей, прошедших фильтр уровня
+        }
+        entry.update(_record_extras(record))
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class TextFormatter(logging.Formatter):
+    """Строка для чтения глазами (LOG_FORMAT=text); поля из extra= дописываются в конец как key=value"""
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        message = super().formatMessage(record)
+        extras = _record_extras(record)
+        if not extras:
+            return message
+        return message + " " + " ".join(f"{key}={value}" for key, value in extras.items())
+
+
+def setup_logging(settings):
+    global _payload_sample_rate, _payload_max_chars
+    _payload_sample_rate = settings.LOG_PAYLOAD_SAMPLE_RATE
+    _payload_max_chars = settings.LOG_PAYLOAD_MAX_CHARS
+
+    handler = logging.StreamHandler()
+    if settings.LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(TextFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(settings.LOG_LEVEL)
+
+
+def log_payload(logger: logging.Logger, message: str, payload: Callable[[], Any], **fields):
+    """Отладочный лог с содержимым (например, всем расписанием) для доли запросов LOG_PAYLOAD_SAMPLE_RATE.
+
+    payload вызывается только для попавших в выборку запросов, результат обрезается до LOG_PAYLOAD_MAX_CHARS.
+    """
+    if not logger.isEnabledFor(logging.DEBUG) or random.random() >= _payload_sample_rate:
+        return
+    text = orjson.dumps(payload(), default=str).decode()
+    if len(text) > _payload_max_chars:
+        text = text[:_payload_max_chars] + "...(truncated)"
+    logger.debug(message, extra={**fields, "payload": text})
+
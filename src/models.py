@@ -6,8 +6,6 @@ from typing import List, Optional, Union
 
 from pydantic import BaseModel, Field, model_validator, ConfigDict
 
-from src.repository.utils import ScheduleGeneratorTimes
-
 
 class Drug(BaseModel):
     drug: str = Field(..., description="Наименование лекарства")
@@ -33,6 +31,8 @@ class User(BaseModel):
 
     @model_validator(mode='after')
     def generate_scheduled_times(self):
+        from src.repository.utils import ScheduleGeneratorTimes
+
         self.schedule, self.last_day_times = ScheduleGeneratorTimes.generate_scheduled_times(self)
         return self
 
@@ -46,6 +46,20 @@ class ScheduleCreate(BaseModel):
     duration_days: Optional[int] = Field(None, ge=1, description="Продолжительность лечения в днях (Optional)")
     user_id: uuid.UUID = Field(..., description="Идентификатор пациента (user_id)")
     schedule_id: int = Field(..., description="Идентификатор расписания (schedule_id)")
+    utc_offset_minutes: Optional[int] = Field(None, ge=-14 * 60, le=14 * 60,
+                                              description="Смещение пациента от UTC в минутах, по умолчанию - "
+                                                          "из first_time (без часового пояса - 0)")
+
+    @model_validator(mode='after')
+    def normalize_first_time(self):
+        # Сохраняется то же настенное время, от которого считаются приёмы, а смещение - отдельно
+        from src.repository.utils import ScheduleGeneratorTimes
+
+        if self.utc_offset_minutes is None:
+            offset = self.first_time.utcoffset()
+            self.utc_offset_minutes = offset // timedelta(minutes=1) if offset is not None else 0
+        self.first_time = ScheduleGeneratorTimes.wall_clock(self.first_time)
+        return self
 
 
 class SchemaScheduleCreate(ScheduleCreate):
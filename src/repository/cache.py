@@ -0,0 +1,100 @@
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from fastapi import Request
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryCacheBackend:
+    # TTL + LRU кэш в памяти процесса, он же локальная замена Redis в тестах
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._items[key]
+            return None
+
+        self._items.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        self._items[key] = (time.monotonic() + ttl, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    async def delete(self, key: str):
+        self._items.pop(key, None)
+
+
+class RedisCacheBackend:
+    # Redis-совместимый сервер, client с интерфейсом redis.asyncio.Redis
+    def __init__(self, client):
+        self.client = client
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self.client.set(key, value, px=int(ttl * 1000))
+
+    async def delete(self, key: str):
+        await self.client.delete(key)
+
+
+class ScheduleCache:
+    # Кэш расписаний пользователей в виде готового JSON.
+    # Ключ включает версию расписания (UserOrm.revision): запись увеличивает версию, и старая запись
+    # кэша больше не читается ни одним процессом, даже если invalidate до него не дошёл
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def key(user_id: uuid.UUID, revision: int) -> str:
+        return f"schedule:{user_id}:{revision}"
+
+    async def get(self, user_id: uuid.UUID, revision: int) -> Optional[bytes]:
+        return await self.backend.get(self.key(user_id, revision))
+
+    async def set(self, user_id: uuid.UUID, revision: int, payload: bytes):
+        await self.backend.set(self.key(user_id, revision), payload, self.ttl)
+
+    async def invalidate(self, user_id: uuid.UUID, revision: int):
+        await self.backend.delete(self.key(user_id, revision))
+
+    async def invalidate_revisions(self, revisions: Dict[uuid.UUID, int]):
+        # После фиксации записи: сбрасывает записи предыдущих версий. Ошибка кэша только логируется -
+        # транзакция уже зафиксирована, а устаревшая запись не читается из-за новой версии в ключе
+        for user_id, revision in revisions.items():
+            try:
+                await self.invalidate(user_id, revision - 1)
+            except Exception:
+                logger.warning("Failed to invalidate schedule cache", exc_info=True,
+                               extra={"user_id": user_id, "revision": revision - 1})
+
+
+def create_schedule_cache(config) -> ScheduleCache:
+    if config.SCHEDULE_CACHE_URL:
+        # redis нужен только при внешнем кэше
+        from redis import asyncio as redis
+        backend = RedisCacheBackend(redis.from_url(config.SCHEDULE_CACHE_URL))
+    else:
+        backend = InMemoryCacheBackend(config.SCHEDULE_CACHE_MAXSIZE)
+    return ScheduleCache(backend, config.SCHEDULE_CACHE_TTL)
+
+
+# Зависимость FastAPI: кэш приложения создаётся в lifespan, в тестах подменяется через app.dependency_overrides
+def get_schedule_cache(request: Request) -> ScheduleCache:
+    return request.app.state.schedule_cache
@@ -0,0 +1,133 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+__all__ = ['Histogram', 'CallbackGauge', 'MetricsRegistry', 'MetricsMiddleware', 'registry',
+           'REQUEST_LATENCY', 'STAGE_LATENCY', 'DOSES_GENERATED', 'CONTENT_TYPE']
+
+# Текстовый формат экспозиции Prometheus 0.0.4
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DOSE_BUCKETS = (10, 100, 500, 1000, 5000, 10000, 20000, 50000, 100000)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    # Счётчики по корзинам хранятся без накопления, кумулятивные значения считаются только при выгрузке
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, *labelvalues: str):
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    @contextmanager
+    def time(self, *labelvalues: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        bounds = [*self.buckets, float("inf")]
+        for labelvalues, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, labelvalues, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class CallbackGauge:
+    # Значение считывается в момент выгрузки (состояние пула соединений, кэша шаблонов)
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        yield f"{self.name} {_format_value(self.callback())}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> bytes:
+        lines = [line for metric in self._metrics.values() for line in metric.collect()]
+        return ("\n".join(lines) + "\n").encode()
+
+
+class MetricsMiddleware:
+    # ASGI-middleware: длительность запроса по шаблону маршрута (а не по пути с user_id), методу и статусу.
+    # Для потоковых ответов учитывается время до последнего отправленного байта
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = ["500"]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_LATENCY.observe(time.perf_counter() - start, scope["method"],
+                                    getattr(route, "path", "unmatched"), status[0])
+
+
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+))
+STAGE_LATENCY = registry.register(Histogram(
+    "schedule_stage_duration_seconds", "Duration of POST /schedule stages", ("stage",)
+))
+DOSES_GENERATED = registry.register(Histogram(
+    "schedule_doses_generated", "Doses generated per schedule", buckets=DOSE_BUCKETS
+))
@@ -0,0 +1,70 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Callable, Optional, Tuple, TypeVar
+
+from fastapi import Request
+
+from src.repository.serialization import dumps
+from src.repository.utils import DoseSeries, ScheduleGeneratorTimes
+
+T = TypeVar("T")
+
+
+def encode_schedule_response(series: DoseSeries) -> bytes:
+    # JSON-ответ POST /schedule
+    return dumps({
+        "message": "Schedule created successfully",
+        "schedule": list(series.iter_dicts()),
+        "last_day_times": series.last_day_times(),
+    })
+
+
+def build_schedule_response(schedule_schema) -> Tuple[DoseSeries, bytes]:
+    # Генерация курса и JSON-ответа POST /schedule; для больших курсов выполняется в пуле
+    series = ScheduleGeneratorTimes.generate_dose_series(schedule_schema)
+    return series, encode_schedule_response(series)
+
+
+class GenerationPool:
+    # Небольшие курсы считаются на месте, большие - в пуле, чтобы не блокировать event loop
+    def __init__(self, threshold: int, size: int, kind: str):
+        self.threshold = threshold
+        self.size = size
+        self.kind = kind
+        self._executor: Optional[Executor] = None
+
+    def get_executor(self) -> Executor:
+        # Пул создаётся при первом большом курсе
+        if self._executor is None:
+            if self.kind == "thread":
+                from concurrent.futures import ThreadPoolExecutor
+                self._executor = ThreadPoolExecutor(max_workers=self.size)
+            else:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # spawn: дочерние процессы не наследуют соединения с БД и состояние event loop
+                self._executor = ProcessPoolExecutor(max_workers=self.size,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def run(self, func: Callable[..., T], schedule_schema) -> T:
+        if ScheduleGeneratorTimes.estimate_dose_count(schedule_schema) < self.threshold:
+            return func(schedule_schema)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.get_executor(), func, schedule_schema)
+
+
+def create_generation_pool(config) -> GenerationPool:
+    return GenerationPool(config.GENERATION_OFFLOAD_THRESHOLD, config.GENERATION_POOL_SIZE,
+                          config.GENERATION_POOL_KIND)
+
+
+# Зависимость FastAPI: пул приложения создаётся в lifespan
+def get_generation_pool(request: Request) -> GenerationPool:
+    return request.app.state.generation_pool
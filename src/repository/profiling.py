@@ -0,0 +1,88 @@
+import asyncio
+import cProfile
+import logging
+import os
+import random
+import re
+import time
+import uuid
+from typing import List
+
+__all__ = ['ProfilingMiddleware', 'rotate_profiles']
+
+logger = logging.getLogger(__name__)
+
+
+def rotate_profiles(directory: str, max_files: int, max_bytes: int):
+    # Удаляет самые старые профили, пока каталог не уложится в лимиты по числу файлов и размеру
+    paths: List[str] = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".prof")]
+    files = sorted(((os.stat(path), path) for path in paths), key=lambda item: item[0].st_mtime)
+    total = sum(stat.st_size for stat, _ in files)
+    while files and (len(files) > max_files or total > max_bytes):
+        stat, path = files.pop(0)
+        total -= stat.st_size
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class ProfilingMiddleware:
+    """ASGI-middleware: cProfile отдельных запросов для разбора медленных случаев.
+
+    Профилируется запрос с заголовком PROFILING_HEADER либо доля PROFILING_SAMPLE_RATE запросов.
+    Профиль сохраняется в PROFILING_DIR (смотреть через python -m pstats или snakeviz), его имя
+    возвращается в заголовке X-Profile-Id. Одновременно профилируется один запрос: cProfile
+    снимает весь поток, поэтому в профиль попадают и корутины параллельных запросов.
+    Подключается только при PROFILING_ENABLED, выключенный не добавляет накладных расходов.
+    """
+
+    def __init__(self, app, header: str, sample_rate: float, directory: str, max_files: int, max_bytes: int):
+        self.app = app
+        self.header = header.lower().encode("latin-1")
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._active = False
+
+    def should_profile(self, scope) -> bool:
+        if self._active:
+            return False
+        if any(name == self.header for name, _ in scope["headers"]):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        route = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "root"
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{scope['method']}-{route[:64]}-{uuid.uuid4().hex[:8]}"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        self._active = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            self._active = False
+            # Запись на диск и ротация вне event loop
+            await asyncio.get_running_loop().run_in_executor(None, self.save, profiler, profile_id)
+
+    def save(self, profiler: cProfile.Profile, profile_id: str):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            profiler.dump_stats(os.path.join(self.directory, f"{profile_id}.prof"))
+            rotate_profiles(self.directory, self.max_files, self.max_bytes)
+        except OSError:
+            logger.exception("Failed to save request profile", extra={"profile_id": profile_id})
+        else:
+            logger.info("Request profile saved", extra={"profile_id": profile_id})
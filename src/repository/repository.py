@@ -1,34 +1,173 @@
 import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from sqlalchemy import select
+from fastapi import Depends
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.DB.ORM_models import UserOrm, ScheduleCreateORM
-from src.DB.database import new_session
+from src.DB.ORM_models import UserOrm, ScheduleCreateORM, DoseOrm
+from src.DB.database import get_db
 from src.models import SchemaScheduleCreate, ScheduleCreate
+from src.repository.utils import DoseSeries, from_epoch_minutes
 
 
 class TaskRepository:
-    @classmethod
-    async def get_user(cls, user_id: uuid.UUID):
-        async with new_session() as session:
-            user = await session.get(UserOrm, user_id)
-            return user
-
-    @classmethod
-    async def add_task(cls, schedule: SchemaScheduleCreate):
-        async with new_session() as session:
-            # Получаем данные из schedule
-            data = schedule.model_dump()
-            new_schedule = ScheduleCreateORM(**data)
-            session.add(new_schedule)
-            await session.flush()
-            await session.commit()
-            return new_schedule
-
-    @classmethod
-    async def get_existing_schedule(cls, user_id: uuid.UUID):
-        async with new_session() as session:
-            schedules = await session.execute(
-                select(ScheduleCreateORM).where(ScheduleCreateORM.user_id == user_id)
+    # Репозиторий привязан к сессии запроса: один запрос - одно соединение из пула
+    DOSE_INSERT_CHUNK = 5000  # Строк doses в одной пакетной вставке
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_user(self, user_id: uuid.UUID):
+        return await self.session.get(UserOrm, user_id)
+
+    async def touch_users(self, user_ids: Iterable[uuid.UUID]):
+        # Одним INSERT ... ON CONFLICT создаёт недостающих пользователей и увеличивает версию расписания остальным.
+        # Диалект импортируется здесь: к этому моменту движок уже загрузил его сам
+        if self.session.bind.dialect.name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        # Строки в порядке user_id: параллельные пакеты блокируют пользователей в одном порядке и не взаимоблокируются
+        now = datetime.now(timezone.utc)
+        stmt = dialect_insert(UserOrm).values([{"user_id": user_id, "revision": 1, "updated_at": now}
+                                               for user_id in sorted(set(user_ids))])
+        revisions = await self.session.execute(stmt.on_conflict_do_update(
+            index_elements=[UserOrm.user_id],
+            set_={"revision": UserOrm.revision + 1, "updated_at": stmt.excluded.updated_at},
+        ).returning(UserOrm.user_id, UserOrm.revision))
+        return dict(revisions.all())
+
+    async def get_user_version(self, user_id: uuid.UUID):
+        # Версия расписания без загрузки пользователя: один поиск по первичному ключу
+        version = await self.session.execute(
+            select(UserOrm.revision, UserOrm.updated_at).where(UserOrm.user_id == user_id)
+        )
+        return version.one_or_none()
+
+    @staticmethod
+    def iter_dose_rows(prescription_id: int, schedule: SchemaScheduleCreate,
+                       series: DoseSeries) -> Iterator[Dict[str, Any]]:
+        # Строки таблицы doses прямо из смещений series.offsets; prescription_id - суррогатный ключ schedule.id
+        start = from_epoch_minutes(series.start_minutes)
+        user_id = schedule.user_id
+        drug = schedule.drug
+        for minutes in series.offsets:
+            yield {"user_id": user_id, "schedule_id": prescription_id, "drug": drug,
+                   "dose_at": start + timedelta(minutes=minutes)}
+
+    async def insert_schedules(self, items: List[Tuple[SchemaScheduleCreate, DoseSeries]]):
+        # Пользователи и назначения без приёмов; возвращает новые версии расписаний и суррогатные ключи назначений
+        revisions = await self.touch_users(schedule.user_id for schedule, _ in items)
+        prescription_ids = await self.session.execute(
+            insert(ScheduleCreateORM).returning(ScheduleCreateORM.id, sort_by_parameter_order=True),
+            [schedule.model_dump() for schedule, _ in items],
+        )
+        return revisions, prescription_ids.scalars().all()
+
+    async def insert_dose_chunks(self, items: List[Tuple[SchemaScheduleCreate, DoseSeries]],
+                                 prescription_ids: List[int]) -> AsyncIterator[List[Dict[str, Any]]]:
+        # Приёмы вставляются порциями по DOSE_INSERT_CHUNK: в памяти не больше одной порции строк,
+        # сколько бы приёмов ни было в курсе или пакете. Каждая вставленная порция отдаётся вызывающему коду
+        dose_rows = []
+        for prescription_id, (schedule, series) in zip(prescription_ids, items):
+            for row in self.iter_dose_rows(prescription_id, schedule, series):
+                dose_rows.append(row)
+                if len(dose_rows) >= self.DOSE_INSERT_CHUNK:
+                    await self.session.execute(insert(DoseOrm), dose_rows)
+                    yield dose_rows
+                    dose_rows = []
+        if dose_rows:
+            await self.session.execute(insert(DoseOrm), dose_rows)
+            yield dose_rows
+
+    async def save_schedules(self, items: List[Tuple[SchemaScheduleCreate, DoseSeries]]):
+        # Назначения и их приёмы пишутся пакетными вставками; возвращает новые версии расписаний пользователей.
+        # Фиксация транзакции остаётся за вызывающим кодом. Повтор (user_id, schedule_id) - IntegrityError
+        revisions, prescription_ids = await self.insert_schedules(items)
+        async for _ in self.insert_dose_chunks(items, prescription_ids):
+            pass
+        return revisions
+
+    async def add_task(self, schedule: SchemaScheduleCreate):
+        # Получаем данные из schedule
+        data = schedule.model_dump()
+        new_schedule = ScheduleCreateORM(**data)
+        self.session.add(new_schedule)
+        await self.session.flush()
+        await self.session.commit()
+        return new_schedule
+
+    async def get_prescription(self, user_id: uuid.UUID, schedule_id: int):
+        prescription = await self.session.execute(
+            select(ScheduleCreateORM).where(ScheduleCreateORM.user_id == user_id,
+                                            ScheduleCreateORM.schedule_id == schedule_id)
+        )
+        return prescription.scalar_one_or_none()
+
+    async def get_existing_schedule_keys(self, keys: Iterable[Tuple[uuid.UUID, int]]):
+        # Уже занятые пары (user_id, schedule_id) из пакета одним запросом IN
+        keys = set(keys)
+        if not keys:
+            return set()
+        existing = await self.session.execute(
+            select(ScheduleCreateORM.user_id, ScheduleCreateORM.schedule_id)
+            .where(tuple_(ScheduleCreateORM.user_id, ScheduleCreateORM.schedule_id).in_(keys))
+        )
+        return set(existing.tuples().all())
+
+    async def get_existing_schedule(self, user_id: uuid.UUID):
+        schedules = await self.session.execute(
+            select(ScheduleCreateORM).where(ScheduleCreateORM.user_id == user_id)
+        )
+        return schedules.scalars().all()
+
+    @staticmethod
+    def select_doses(user_id: uuid.UUID):
+        # Приёмы пациента вместе с клиентским schedule_id назначения (doses.schedule_id - суррогатный ключ)
+        return (
+            select(DoseOrm, ScheduleCreateORM.schedule_id)
+            .join(ScheduleCreateORM, DoseOrm.schedule_id == ScheduleCreateORM.id)
+            .where(DoseOrm.user_id == user_id)
+        )
+
+    async def get_doses(self, user_id: uuid.UUID, start: Optional[datetime] = None, end: Optional[datetime] = None):
+        # Диапазонное чтение по индексу (user_id, dose_at); строки (DoseOrm, schedule_id)
+        stmt = self.select_doses(user_id)
+        if start is not None:
+            stmt = stmt.where(DoseOrm.dose_at >= start)
+        if end is not None:
+            stmt = stmt.where(DoseOrm.dose_at < end)
+
+        doses = await self.session.execute(stmt.order_by(DoseOrm.dose_at, DoseOrm.id))
+        return doses.all()
+
+    async def get_doses_page(self, user_id: uuid.UUID, after: Optional[Tuple[datetime, int]], limit: int):
+        # Постраничная выдача по ключу (dose_at, id): стоимость страницы не зависит от её номера
+        stmt = self.select_doses(user_id)
+        if after is not None:
+            stmt = stmt.where(tuple_(DoseOrm.dose_at, DoseOrm.id) > tuple_(*after))
+
+        doses = await self.session.execute(stmt.order_by(DoseOrm.dose_at, DoseOrm.id).limit(limit))
+        return doses.all()
+
+    async def get_schedule_view(self, user_id: uuid.UUID):
+        # Расписания пользователя по назначениям и последние приёмы по дням, построенные из таблицы doses
+        schedules = {}
+        last_day_times = {}
+        for dose, schedule_id in await self.get_doses(user_id):
+            schedule = schedules.setdefault(
+                schedule_id, {"schedule_id": schedule_id, "drug": dose.drug, "scheduled_times": []}
             )
-            return schedules.scalars().all()
\ No newline at end of file
+            schedule["scheduled_times"].append(dose.dose_at)
+            last_day_times[(schedule_id, dose.dose_at.date())] = dose.dose_at
+
+        return {
+            "schedules": [schedules[schedule_id] for schedule_id in sorted(schedules)],
+            "last_day_times": [last_day_times[key] for key in sorted(last_day_times)],
+        }
+
+
+# Зависимость FastAPI: репозиторий на той же сессии, что и Depends(get_db) в обработчике
+def get_repository(db: AsyncSession = Depends(get_db)) -> TaskRepository:
+    return TaskRepository(db)
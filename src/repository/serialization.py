@@ -0,0 +1,37 @@
+import base64
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, Tuple
+
+import orjson
+
+# orjson сериализует datetime (ISO 8601) и UUID нативно, без предварительного обхода через serialize_datetime
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def dumps(data: Any) -> bytes:
+    return orjson.dumps(data, option=ORJSON_OPTIONS)
+
+
+def loads(data: bytes) -> Any:
+    return orjson.loads(data)
+
+
+# Построчная сериализация приёмов для потоковых ответов (NDJSON)
+def iter_ndjson(doses: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    option = ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE
+    for dose in doses:
+        yield orjson.dumps(dose, option=option)
+
+
+# Непрозрачный курсор постраничной выдачи: позиция (dose_at, id) последнего отданного приёма
+def encode_cursor(dose_at: datetime, dose_id: int) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps([dose_at, dose_id])).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Разбирает курсор из encode_cursor, ValueError для некорректного курсора"""
+    try:
+        dose_at, dose_id = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(dose_at), int(dose_id)
+    except (TypeError, ValueError, orjson.JSONDecodeError) as e:
+        raise ValueError("Некорректный курсор") from e
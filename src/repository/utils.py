@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+import heapq
+import logging
 import uuid
-from datetime import datetime, timedelta, timezone
-from typing import List, Tuple, Optional, Any, Dict, Union
+from array import array
+from functools import lru_cache
+from itertools import islice
+from datetime import date, datetime, time, timedelta, timezone
+from typing import List, Tuple, Optional, Any, Dict, Union, Iterator, Iterable
 
 from typing import TYPE_CHECKING
 
@@ -11,9 +16,36 @@ if TYPE_CHECKING:
     from src.models import SchemaScheduleCreate
 
 
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
 class ScheduleGeneratorTimes:
     DAY_START_HOUR = 8
     DAY_END_HOUR = 22
+    DAY_FIRST_MINUTE = 15  # Приёмы со второго дня начинаются в 08:15
+    LAST_DAY_END_HOUR = 10  # В последний день приёмы только до 10:00
+    TEMPLATE_CACHE_SIZE = 128  # Число шаблонов курса в LRU-кэше
+    TEMPLATE_CACHE_MAX_DOSES = 20000  # Шаблоны длиннее не кэшируются: кэш не больше ~128 * 20000 * 8 байт
+
+    @staticmethod
+    def wall_clock(value: Optional[datetime]) -> Optional[datetime]:
+        """Время первого приёма как настенное время пациента, помеченное UTC.
+
+        Смещение из запроса отбрасывается: 09:05+03:00 - это приём в 09:15 по часам пациента.
+        Применяется и перед сохранением назначения, и при генерации из сохранённого значения,
+        поэтому timestamptz в БД не сдвигает приёмы при чтении.
+        """
+        if value is None:
+            return None
+        return value.replace(tzinfo=timezone.utc)
+
+    @staticmethod
+    def patient_wall_clock(value: datetime, utc_offset_minutes: int) -> datetime:
+        """Момент времени как настенное время пациента с меткой UTC - в той же шкале, что и приёмы"""
+        return to_utc(value) + timedelta(minutes=utc_offset_minutes)
 
     @staticmethod
     def round_minute(value: datetime) -> datetime:
@@ -32,87 +64,274 @@ class ScheduleGeneratorTimes:
             return value.replace(hour=(value.hour + 1) % 24, minute=0, second=0, microsecond=0)
 
     @classmethod
-    def generate_scheduled_times(cls, schedule_schema) -> Tuple[
-        List[Dict[str, Union[datetime, str]]], List[Union[datetime, None]]]:
-        schedule = []
-        last_day_times = []
-        first_time_rounded = cls.round_minute(schedule_schema.first_time)
+    def first_day_offsets(cls, first_minute: int, step: int) -> range:
+        """Приёмы первого дня (минуты от полуночи): с момента первого приёма, только внутри окна 08:00-22:00"""
+        window_start = cls.DAY_START_HOUR * 60
+        if first_minute < window_start:
+            # Пропускаем приёмы, выпадающие на ночь, сдвигаясь на целое число периодов
+            first_minute += -(-(window_start - first_minute) // step) * step
+        return range(first_minute, cls.DAY_END_HOUR * 60, step)
 
-        if first_time_rounded is None:
-            return [], []  # Возвращаем пустые списки, если время некорректно
+    @classmethod
+    def middle_day_offsets(cls, step: int) -> range:
+        """Приёмы промежуточных дней (минуты от полуночи): с 08:15 до 22:00"""
+        return range(cls.DAY_START_HOUR * 60 + cls.DAY_FIRST_MINUTE, cls.DAY_END_HOUR * 60, step)
+
+    @classmethod
+    def last_day_offsets(cls, step: int) -> range:
+        """Приёмы последнего дня (минуты от полуночи): с 08:15 до 10:00"""
+        return range(cls.DAY_START_HOUR * 60 + cls.DAY_FIRST_MINUTE, cls.LAST_DAY_END_HOUR * 60, step)
 
-        # Приводим к timezone-aware datetime
-        first_time_dt = first_time_rounded.replace(tzinfo=timezone.utc)
+    @classmethod
+    def course_template(cls, first_minute: int, periodicity: int, duration: int) -> Tuple[array, array]:
+        """Шаблон курса: приёмы в минутах от полуночи первого дня и последний приём каждого дня.
 
-        if schedule_schema.duration_days is None or schedule_schema.duration_days <= 0:
-            print(f"Ошибка: Некорректная продолжительность лечения для лекарства {schedule_schema.drug}")
-            return [], []
+        Зависит только от времени первого приёма, периодичности и длительности, поэтому кэшируется
+        и переиспользуется для всех пациентов с таким же назначением. Возвращаемые массивы не изменять.
+        Шаблоны больше TEMPLATE_CACHE_MAX_DOSES приёмов строятся заново: иначе 128 многолетних курсов
+        удерживали бы сотни мегабайт, а для таких курсов построение шаблона - малая доля запроса.
+        """
+        if duration * cls.max_day_doses(periodicity) > cls.TEMPLATE_CACHE_MAX_DOSES:
+            return cls.build_course_template(first_minute, periodicity, duration)
+        return cls.cached_course_template(first_minute, periodicity, duration)
 
-        duration = schedule_schema.duration_days
+    @classmethod
+    @lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+    def cached_course_template(cls, first_minute: int, periodicity: int, duration: int) -> Tuple[array, array]:
+        return cls.build_course_template(first_minute, periodicity, duration)
 
-        for day in range(duration):
-            current_date = first_time_dt.date() + timedelta(days=day)
-            schedule_time = None
+    @classmethod
+    def build_course_template(cls, first_minute: int, periodicity: int, duration: int) -> Tuple[array, array]:
+        doses = array('q')
+        last_day_times = array('q')
+        step = periodicity * 60
+        first_offsets = cls.first_day_offsets(first_minute, step)
+        middle_offsets = cls.middle_day_offsets(step)
+        last_offsets = cls.last_day_offsets(step)
 
+        for day in range(duration):
             if day == 0:
-                schedule_time = first_time_dt
-            elif day == duration - 1:  # Если это последний день
-                schedule_time = datetime.combine(current_date, datetime.min.time()).replace(
-                    hour=ScheduleGeneratorTimes.DAY_START_HOUR, minute=15, tzinfo=timezone.utc)  # Начинаем с 08:15
+                offsets = first_offsets
+            elif day == duration - 1:
+                offsets = last_offsets
             else:
-                schedule_time = datetime.combine(current_date, datetime.min.time()).replace(
-                    hour=ScheduleGeneratorTimes.DAY_START_HOUR, minute=15, tzinfo=timezone.utc)  # Начинаем с 08:15
+                offsets = middle_offsets
 
-            end_time_day = datetime.combine(current_date, datetime.min.time()).replace(
-                hour=ScheduleGeneratorTimes.DAY_END_HOUR, minute=0, tzinfo=timezone.utc)
+            if not offsets:
+                continue
 
-            last_time_for_day = None  # Для отслеживания последнего приема в день
+            day_start = day * MINUTES_PER_DAY
+            doses.extend(range(day_start + offsets.start, day_start + offsets.stop, offsets.step))
+            last_day_times.append(day_start + offsets[-1])  # Последний приём за день
 
-            # На первом дне
-            if day == 0:
-                while schedule_time < end_time_day:
-                    if ScheduleGeneratorTimes.DAY_START_HOUR <= schedule_time.hour < ScheduleGeneratorTimes.DAY_END_HOUR:
-                        schedule.append({
-                            "time": schedule_time,
-                            "drug_name": schedule_schema.drug,
-                            "user_id": schedule_schema.user_id
-                        })
-                        last_time_for_day = schedule_time
-
-                    schedule_time += timedelta(hours=schedule_schema.periodicity)
-
-            # На промежуточных днях
-            elif 0 < day < duration - 1:
-                while schedule_time < end_time_day:
-                    if ScheduleGeneratorTimes.DAY_START_HOUR <= schedule_time.hour < ScheduleGeneratorTimes.DAY_END_HOUR:
-                        schedule.append({
-                            "time": schedule_time,
-                            "drug_name": schedule_schema.drug,
-                            "user_id": schedule_schema.user_id
-                        })
-                        last_time_for_day = schedule_time
-
-                    schedule_time += timedelta(hours=schedule_schema.periodicity)
-
-            # На последнем дне
-            elif day == duration - 1:
-                while schedule_time < end_time_day:
-                    if schedule_time.hour < 10:  # до 10:15 только
-                        schedule.append({
-                            "time": schedule_time,
-                            "drug_name": schedule_schema.drug,
-                            "user_id": schedule_schema.user_id
-                        })
-                        last_time_for_day = schedule_time
+        return doses, last_day_times
+
+    @classmethod
+    def template_cache_info(cls) -> Dict[str, int]:
+        info = cls.cached_course_template.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize,
+                "max_doses": cls.TEMPLATE_CACHE_MAX_DOSES}
+
+    @classmethod
+    def day_offsets(cls, first_time_rounded: datetime, periodicity: int,
+                    duration: Optional[int], day_index: int) -> range:
+        """Шаблон приёмов (минуты от полуночи) для дня курса с номером day_index"""
+        if day_index < 0 or (duration is not None and day_index >= duration):
+            return range(0)
+
+        step = periodicity * 60
+        if day_index == 0:
+            return cls.first_day_offsets(first_time_rounded.hour * 60 + first_time_rounded.minute, step)
+        if duration is not None and day_index == duration - 1:
+            return cls.last_day_offsets(step)
+        return cls.middle_day_offsets(step)
+
+    @classmethod
+    def generate_day_times(cls, schedule_schema, day: date) -> List[datetime]:
+        """Приёмы на одну календарную дату, без генерации всего курса.
+
+        Работает за O(приёмов в день), в том числе для постоянного приёма (duration_days=None).
+        """
+        first_time_rounded = cls.round_minute(cls.wall_clock(schedule_schema.first_time))
+        if first_time_rounded is None:
+            return []
+
+        duration = schedule_schema.duration_days
+        if duration is not None and duration <= 0:
+            return []
 
-                    schedule_time += timedelta(hours=schedule_schema.periodicity)
+        day_index = (day - first_time_rounded.date()).days
+        offsets = cls.day_offsets(first_time_rounded, schedule_schema.periodicity, duration, day_index)
 
-            if last_time_for_day:
-                last_day_times.append(last_time_for_day)  # Добавляем последнее время приема для дня
+        day_start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+        return [day_start + timedelta(minutes=minutes) for minutes in offsets]
 
-        return schedule, last_day_times
+    @classmethod
+    def iter_scheduled_times(cls, schedule_schema, start: datetime,
+                             end: Optional[datetime] = None) -> Iterator[Dict[str, Union[datetime, str]]]:
+        """Лениво выдаёт приёмы из окна [start, end), без end - до конца курса.
+
+        Первый приём окна находится арифметически, память не зависит от длины курса,
+        поэтому подходит для постоянного приёма (duration_days=None).
+        """
+        first_time_rounded = cls.round_minute(cls.wall_clock(schedule_schema.first_time))
+        if first_time_rounded is None:
+            return
+
+        duration = schedule_schema.duration_days
+        if duration is not None and duration <= 0:
+            return
 
+        # Границы окна переводятся в UTC до вычисления дней: 00:30+05:00 - это ещё предыдущие сутки UTC
+        start = to_utc(start)
+        if end is not None:
+            end = to_utc(end)
 
+        first_date = first_time_rounded.date()
+        day_index = max((start.date() - first_date).days, 0)
+        last_index = (end.date() - first_date).days if end is not None else None
+        if duration is not None:
+            last_index = duration - 1 if last_index is None else min(last_index, duration - 1)
+
+        drug_name = schedule_schema.drug
+        user_id = schedule_schema.user_id
+        while last_index is None or day_index <= last_index:
+            offsets = cls.day_offsets(first_time_rounded, schedule_schema.periodicity, duration, day_index)
+            day_start = datetime.combine(first_date + timedelta(days=day_index), time.min, tzinfo=timezone.utc)
+
+            # Пропускаем приёмы до start без перебора
+            start_minute = -((day_start - start) // timedelta(minutes=1))
+            if offsets and start_minute > offsets.start:
+                offsets = offsets[-(-(start_minute - offsets.start) // offsets.step):]
+
+            for minutes in offsets:
+                dose_time = day_start + timedelta(minutes=minutes)
+                if end is not None and dose_time >= end:
+                    return
+                yield {"time": dose_time, "drug_name": drug_name, "user_id": user_id}
+            day_index += 1
+
+    @classmethod
+    def next_takings(cls, schedules: Iterable, after: datetime, limit: int) -> List[Dict[str, Union[datetime, str]]]:
+        """Ближайшие limit приёмов по всем назначениям после момента after.
+
+        Приёмы - настенное время пациента, поэтому after переводится на часы пациента по смещению
+        каждого назначения. Первый приём каждого назначения считается арифметически, затем потоки
+        сливаются кучей: O(P log P + limit log P) для P назначений.
+        """
+        streams = [
+            cls.iter_scheduled_times(schedule, cls.patient_wall_clock(after, schedule.utc_offset_minutes))
+            for schedule in schedules
+        ]
+        return list(islice(heapq.merge(*streams, key=lambda dose: dose["time"]), limit))
+
+    @classmethod
+    def max_day_doses(cls, periodicity: int) -> int:
+        """Наибольшее число приёмов за один день курса: все приёмы дня лежат внутри окна 08:00-22:00"""
+        return len(range(cls.DAY_START_HOUR * 60, cls.DAY_END_HOUR * 60, periodicity * 60))
+
+    @classmethod
+    def estimate_dose_count(cls, schedule_schema) -> int:
+        """Оценка числа приёмов курса сверху, без генерации"""
+        duration = schedule_schema.duration_days
+        if duration is None or duration <= 0:
+            return 0
+        return duration * cls.max_day_doses(schedule_schema.periodicity)
+
+    @classmethod
+    def generate_dose_series(cls, schedule_schema) -> DoseSeries:
+        """Вычисляет приёмы всего курса без создания datetime и dict на каждый приём.
+
+        Шаблон курса берётся из кэша и только сдвигается на дату начала.
+        """
+        empty = DoseSeries(schedule_schema.drug, schedule_schema.user_id, 0, array('q'), array('q'))
+        first_time_rounded = cls.round_minute(cls.wall_clock(schedule_schema.first_time))
+
+        if first_time_rounded is None:
+            return empty
+
+        duration = schedule_schema.duration_days
+        if duration is None or duration <= 0:
+            logger.warning("Некорректная продолжительность лечения для лекарства %s", schedule_schema.drug,
+                           extra={"duration_days": duration})
+            return empty
+
+        offsets, last_day_offsets = cls.course_template(
+            first_time_rounded.hour * 60 + first_time_rounded.minute, schedule_schema.periodicity, duration
+        )
+        start_minutes = to_epoch_minutes(datetime.combine(first_time_rounded.date(), time.min, tzinfo=timezone.utc))
+        return DoseSeries(schedule_schema.drug, schedule_schema.user_id, start_minutes, offsets, last_day_offsets)
+
+    @classmethod
+    def generate_scheduled_times(cls, schedule_schema) -> Tuple[
+        List[Dict[str, Union[datetime, str]]], List[Union[datetime, None]]]:
+        series = cls.generate_dose_series(schedule_schema)
+
+        # dict на каждый приём создаётся только здесь, на границе API
+        return list(series.iter_dicts()), series.last_day_times()
+
+
+class DoseSeries:
+    """Приёмы одного назначения в колоночном виде.
+
+    Лекарство и пациент хранятся один раз, времена приёмов - общим (кэшированным) массивом смещений
+    в минутах от начала курса (8 байт на приём). Публичный формат {"time", "drug_name", "user_id"}
+    создаётся только при отдаче ответа.
+    """
+    __slots__ = ("drug_name", "user_id", "start_minutes", "offsets", "last_day_offsets")
+
+    def __init__(self, drug_name: str, user_id: uuid.UUID, start_minutes: int, offsets: array,
+                 last_day_offsets: array):
+        self.drug_name = drug_name
+        self.user_id = user_id
+        self.start_minutes = start_minutes  # Полночь первого дня курса, минуты от эпохи Unix
+        self.offsets = offsets
+        self.last_day_offsets = last_day_offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def summary(self) -> Dict[str, Any]:
+        """Сводка для логов: размер записи не зависит от длины курса"""
+        if not self.offsets:
+            return {"doses": 0}
+        return {
+            "doses": len(self.offsets),
+            "first_dose": from_epoch_minutes(self.start_minutes + self.offsets[0]),
+            "last_dose": from_epoch_minutes(self.start_minutes + self.offsets[-1]),
+        }
+
+    def times(self) -> Iterator[datetime]:
+        start = from_epoch_minutes(self.start_minutes)
+        for minutes in self.offsets:
+            yield start + timedelta(minutes=minutes)
+
+    def last_day_times(self) -> List[datetime]:
+        start = from_epoch_minutes(self.start_minutes)
+        return [start + timedelta(minutes=minutes) for minutes in self.last_day_offsets]
+
+    def iter_dicts(self) -> Iterator[Dict[str, Union[datetime, str]]]:
+        drug_name = self.drug_name
+        user_id = self.user_id
+        for dose_time in self.times():
+            yield {"time": dose_time, "drug_name": drug_name, "user_id": user_id}
+
+
+def to_epoch_minutes(value: datetime) -> int:
+    """Переводит timezone-aware datetime в целое число минут от эпохи Unix"""
+    return (value - EPOCH) // timedelta(minutes=1)
+
+
+def to_utc(value: datetime) -> datetime:
+    """Переводит datetime в UTC; время без часового пояса считается временем UTC"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def from_epoch_minutes(value: int) -> datetime:
+    """Переводит минуты от эпохи Unix обратно в datetime (UTC)"""
+    return EPOCH + timedelta(minutes=value)
 
 
 # Конвертация всех datetime-объектов в строку
@@ -125,4 +344,5 @@ def serialize_datetime(data):
         return data.isoformat()  # Конвертация datetime в строку в ISO формате
     elif isinstance(data, uuid.UUID):
         return str(data)  # Конвертация UUID в строку
-    return data
\ No newline at end of file
+    return data
+
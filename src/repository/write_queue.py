@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Request
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.models import SchemaScheduleCreate
+from src.repository.cache import ScheduleCache
+from src.repository.repository import TaskRepository
+from src.repository.utils import DoseSeries
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+SAVED = "saved"
+FAILED = "failed"
+
+
+class ScheduleWriteQueue:
+    # Отложенная запись расписаний: обработчик кладёт назначение в очередь и сразу отвечает 202,
+    # воркеры забирают назначения пачками и сохраняют каждую пачку одной транзакцией.
+    # Статусы хранятся по серверному status_id: клиентский schedule_id уникален только в пределах пациента
+    def __init__(self, session_factory: async_sessionmaker, cache: ScheduleCache, workers: int, batch_size: int,
+                 maxsize: int, status_maxsize: int = 100000):
+        self.session_factory = session_factory
+        self.cache = cache
+        self.workers = workers
+        self.batch_size = batch_size
+        self.status_maxsize = status_maxsize
+        self._queue = asyncio.Queue(maxsize=maxsize)
+        self._statuses = OrderedDict()
+        self._tasks = []
+
+    async def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        # Дописываем всё, что уже принято, и останавливаем воркеры
+        await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, schedule: SchemaScheduleCreate, series: DoseSeries) -> Optional[str]:
+        # status_id принятого назначения; None, если очередь переполнена - тогда обработчик пишет синхронно
+        status_id = uuid.uuid4().hex
+        try:
+            self._queue.put_nowait((status_id, schedule, series))
+        except asyncio.QueueFull:
+            return None
+
+        self._set_status(status_id, PENDING)
+        return status_id
+
+    def status(self, status_id: str) -> Optional[str]:
+        return self._statuses.get(status_id)
+
+    def _set_status(self, status_id: str, status: str):
+        self._statuses[status_id] = status
+        self._statuses.move_to_end(status_id)
+        while len(self._statuses) > self.status_maxsize:
+            self._statuses.popitem(last=False)
+
+    async def _worker(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                await self._save(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _save(self, batch: List[Tuple[str, SchemaScheduleCreate, DoseSeries]]):
+        try:
+            revisions = await self._commit([(schedule, series) for _, schedule, series in batch])
+        except Exception:
+            if len(batch) == 1:
+                status_id, schedule, _ = batch[0]
+                logger.exception("Failed to save schedule", extra={
+                    "status_id": status_id, "user_id": schedule.user_id, "schedule_id": schedule.schedule_id,
+                })
+                self._set_status(status_id, FAILED)
+                return
+            # Одно ошибочное назначение не должно терять всю пачку: сохраняем по одному
+            logger.warning("Schedule batch failed, retrying one by one", extra={"schedules": len(batch)})
+            for item in batch:
+                await self._save([item])
+            return
+
+        for status_id, _, _ in batch:
+            self._set_status(status_id, SAVED)
+        # Пачка уже зафиксирована: сброс кэша вне повторов и не меняет статусы
+        await self.cache.invalidate_revisions(revisions)
+
+    async def _commit(self, batch: List[Tuple[SchemaScheduleCreate, DoseSeries]]) -> Dict[uuid.UUID, int]:
+        async with self.session_factory() as session:
+            revisions = await TaskRepository(session).save_schedules(batch)
+            await session.commit()
+        return revisions
+
+
+def create_write_queue(config, session_factory: async_sessionmaker,
+                       cache: ScheduleCache) -> Optional[ScheduleWriteQueue]:
+    if not config.WRITE_BEHIND_ENABLED:
+        return None
+    return ScheduleWriteQueue(
+        session_factory,
+        cache,
+        workers=config.WRITE_BEHIND_WORKERS,
+        batch_size=config.WRITE_BEHIND_BATCH_SIZE,
+        maxsize=config.WRITE_BEHIND_QUEUE_SIZE,
+    )
+
+
+# Зависимость FastAPI; None, если отложенная запись выключена
+def get_write_queue(request: Request) -> Optional[ScheduleWriteQueue]:
+    return request.app.state.write_queue
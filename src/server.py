@@ -0,0 +1,85 @@
+"""Запуск сервера в production: несколько процессов uvicorn на одном сокете.
+
+    python -m src.server                      # воркеров по числу доступных CPU, настройки SERVER_* из окружения
+    python -m src.server --workers 4 --port 8080
+
+Каждый воркер - отдельный процесс (spawn) со своим приложением из create_app(): движок и пул
+соединений создаются в его lifespan, поэтому соединения с БД между процессами не делятся.
+"""
+import argparse
+import importlib.util
+import logging
+import os
+from typing import List, Optional
+
+from src.config.config import get_settings
+from src.config.log import setup_logging
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def available_cpus() -> int:
+    # В контейнере процессу может быть доступна только часть CPU машины
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def select_loop() -> str:
+    return "uvloop" if importlib.util.find_spec("uvloop") is not None else "asyncio"
+
+
+def select_http() -> str:
+    return "httptools" if importlib.util.find_spec("httptools") is not None else "h11"
+
+
+def main(argv: Optional[List[str]] = None):
+    # Аргументы разбираются до чтения настроек: --help работает и без переменных DB_*
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", help="по умолчанию SERVER_HOST")
+    parser.add_argument("--port", type=int, help="по умолчанию SERVER_PORT")
+    parser.add_argument("--workers", type=int,
+                        help="число процессов, по умолчанию SERVER_WORKERS или число доступных CPU")
+    args = parser.parse_args(argv)
+
+    settings = get_settings()
+    host = args.host if args.host is not None else settings.SERVER_HOST
+    port = args.port if args.port is not None else settings.SERVER_PORT
+
+    import uvicorn
+
+    setup_logging(settings)
+    workers = args.workers or settings.SERVER_WORKERS or available_cpus()
+    loop = select_loop()
+    http = select_http()
+
+    # Пул соединений у каждого воркера свой: к БД открывается до workers * (pool_size + max_overflow)
+    logger.info("Starting server", extra={
+        "host": host, "port": port, "workers": workers, "loop": loop, "http": http,
+        "max_db_connections": None if settings.DB_USE_NULL_POOL
+        else workers * (settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW),
+    })
+
+    uvicorn.run(
+        "main:create_app",
+        factory=True,
+        app_dir=PROJECT_DIR,
+        host=host,
+        port=port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEP_ALIVE,
+        limit_concurrency=settings.SERVER_LIMIT_CONCURRENCY,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_SHUTDOWN_TIMEOUT,
+        access_log=settings.SERVER_ACCESS_LOG,
+        # Логи uvicorn идут через корневой логгер, настроенный setup_logging (JSON)
+        log_config=None,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# Settings требует DB_*; сами тесты работают с SQLite через DB_URL
+for name, value in {"DB_USER": "test", "DB_PASSWORD": "test", "DB_HOST": "localhost", "DB_PORT": "5432",
+                    "DB_NAME": "test"}.items():
+    os.environ.setdefault(name, value)
+
+from src.config.config import Settings, get_settings  # noqa: E402
+from tests.helpers import open_client, sqlite_url  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def migrated_db(tmp_path_factory):
+    # Схема создаётся миграциями один раз, каждый тест получает копию файла
+    from alembic import command
+    from alembic.config import Config
+
+    from src.DB.database import ALEMBIC_INI
+
+    path = tmp_path_factory.mktemp("schema") / "schema.db"
+    previous_url = os.environ.get("DB_URL")
+    os.environ["DB_URL"] = sqlite_url(path)
+    get_settings.cache_clear()
+    try:
+        # env.py миграций вызывает asyncio.run, который сбрасывает event loop текущего потока
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(command.upgrade, Config(ALEMBIC_INI), "head").result()
+    finally:
+        if previous_url is None:
+            os.environ.pop("DB_URL")
+        else:
+            os.environ["DB_URL"] = previous_url
+        get_settings.cache_clear()
+    return path
+
+
+@pytest.fixture
+def settings(migrated_db, tmp_path) -> Settings:
+    path = tmp_path / "test.db"
+    shutil.copy(migrated_db, path)
+    return Settings(DB_URL=sqlite_url(path), GENERATION_POOL_KIND="thread")
+
+
+@pytest.fixture
+def app_client(settings):
+    # Приложение поднимается внутри теста (async with app_client() as client): закреплённый
+    # pytest-asyncio 0.22 не умеет async-фикстуры с pytest 8
+    def factory(**overrides):
+        return open_client(settings.model_copy(update=overrides))
+    return factory
@@ -0,0 +1,48 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+import httpx
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def sqlite_url(path) -> str:
+    return f"sqlite+aiosqlite:///{path}"
+
+
+def schedule_body(user_id, schedule_id: int = 1, **fields):
+    body = {"first_time": "2024-03-10T09:05:00", "drug": "aspirin", "periodicity": 6, "duration_days": 5,
+            "user_id": str(user_id), "schedule_id": schedule_id}
+    body.update(fields)
+    return body
+
+
+@asynccontextmanager
+async def running_app(settings):
+    # Приложение с выполненным lifespan: app.state заполнен, как в сервере
+    from main import create_app
+
+    app = create_app(settings)
+    async with app.router.lifespan_context(app):
+        yield app
+
+
+def client_for(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@asynccontextmanager
+async def open_client(settings):
+    async with running_app(settings) as app, client_for(app) as client:
+        yield client
+
+
+async def wait_for_status(client, status_url: str, timeout: float = 5.0) -> str:
+    # Запись идёт в фоне: ждём, пока статус перестанет быть pending
+    for _ in range(int(timeout / 0.05)):
+        status = (await client.get(status_url)).json()["status"]
+        if status != "pending":
+            return status
+        await asyncio.sleep(0.05)
+    return status
@@ -0,0 +1,52 @@
+import uuid
+
+import pytest
+
+from src.repository.utils import ScheduleGeneratorTimes
+from tests.helpers import schedule_body
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_bulk_reports_existing_and_duplicate_ids(app_client):
+    async with app_client() as client:
+        user_id, other_user_id = uuid.uuid4(), uuid.uuid4()
+        assert (await client.post("/schedule", json=schedule_body(user_id, schedule_id=1))).status_code == 200
+
+        response = await client.post("/schedules/bulk", json=[
+            schedule_body(user_id, schedule_id=1),
+            schedule_body(user_id, schedule_id=2),
+            schedule_body(other_user_id, schedule_id=1),
+            schedule_body(other_user_id, schedule_id=1),
+        ])
+
+        assert response.status_code == 200
+        assert [result["status"] for result in response.json()["results"]] == ["error", "created", "created", "error"]
+        schedules = await client.get("/schedules", params={"user_id": str(user_id)})
+        assert [schedule["schedule_id"] for schedule in schedules.json()["schedules"]] == [1, 2]
+
+async def test_bulk_generation_failure_is_per_item(app_client, monkeypatch):
+    generate = ScheduleGeneratorTimes.generate_dose_series
+
+    def failing_generate(schedule):
+        if schedule.drug == "broken":
+            raise ValueError("broken schedule")
+        return generate(schedule)
+
+    monkeypatch.setattr(ScheduleGeneratorTimes, "generate_dose_series", failing_generate)
+    async with app_client() as client:
+        user_id, other_user_id = uuid.uuid4(), uuid.uuid4()
+        response = await client.post("/schedules/bulk", json=[
+            schedule_body(user_id, schedule_id=1),
+            schedule_body(user_id, schedule_id=2, drug="broken"),
+            schedule_body(other_user_id, schedule_id=1, periodicity=4),
+        ])
+
+        results = response.json()["results"]
+        assert [result["status"] for result in results] == ["created", "error", "created"]
+        assert results[1]["detail"] == "Schedule generation failed"
+        # Остальные назначения пакета сохранены одной транзакцией
+        for result in (results[0], results[2]):
+            schedules = await client.get("/schedules", params={"user_id": result["user_id"]})
+            assert [len(schedule["scheduled_times"]) for schedule in schedules.json()["schedules"]] == \
+                [result["doses"]]
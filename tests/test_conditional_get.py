@@ -0,0 +1,71 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from main import is_not_modified
+from tests.helpers import schedule_body
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_schedules_not_modified(app_client):
+    async with app_client() as client:
+        user_id = uuid.uuid4()
+        await client.post("/schedule", json=schedule_body(user_id))
+
+        response = await client.get("/schedules", params={"user_id": str(user_id)})
+        etag = response.headers["etag"]
+        assert response.status_code == 200
+
+        cached = await client.get("/schedules", params={"user_id": str(user_id)}, headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+
+        # Новое назначение увеличивает версию пользователя (upsert), старый ETag не подходит
+        await client.post("/schedule", json=schedule_body(user_id, schedule_id=2))
+        changed = await client.get("/schedules", params={"user_id": str(user_id)}, headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+        assert len(changed.json()["schedules"]) == 2
+
+
+async def test_schedules_unknown_user(app_client):
+    async with app_client() as client:
+        response = await client.get("/schedules", params={"user_id": str(uuid.uuid4())})
+        assert response.status_code == 404
+
+
+@pytest.mark.parametrize("if_none_match, if_modified_since, expected", [
+    ('"3"', None, True),
+    ('W/"3"', None, True),
+    ('"1", "3"', None, True),
+    ("*", None, True),
+    ('"2"', None, False),
+    # If-None-Match важнее If-Modified-Since
+    ('"2"', "Sun, 10 Mar 2024 12:00:00 GMT", False),
+    (None, "Sun, 10 Mar 2024 12:00:00 GMT", True),
+    (None, "Sun, 10 Mar 2024 11:59:59 GMT", False),
+    (None, "not a date", False),
+    (None, None, False),
+])
+async def test_is_not_modified(if_none_match, if_modified_since, expected):
+    updated_at = datetime(2024, 3, 10, 12, 0, 0, 500000, tzinfo=timezone.utc)
+    assert is_not_modified(3, updated_at, if_none_match, if_modified_since) is expected
+
+
+async def test_last_modified_round_trip(app_client):
+    async with app_client() as client:
+        user_id = uuid.uuid4()
+        await client.post("/schedule", json=schedule_body(user_id))
+        response = await client.get("/schedules", params={"user_id": str(user_id)})
+
+        cached = await client.get("/schedules", params={"user_id": str(user_id)},
+                                  headers={"If-Modified-Since": response.headers["last-modified"]})
+        assert cached.status_code == 304
+
+        earlier = datetime.now(timezone.utc) - timedelta(days=1)
+        stale = await client.get("/schedules", params={"user_id": str(user_id)},
+                                 headers={"If-Modified-Since": format_datetime(earlier, usegmt=True)})
+        assert stale.status_code == 200
@@ -0,0 +1,52 @@
+import uuid
+
+import pytest
+
+from tests.helpers import schedule_body
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_doses_keyset_pagination(app_client):
+    async with app_client() as client:
+        user_id = uuid.uuid4()
+        # Назначения 1 и 2 дают приёмы с одинаковым dose_at
+        for schedule_id, first_time in [(1, "2024-03-10T09:05"), (2, "2024-03-10T09:05"), (3, "2024-03-10T11:40")]:
+            body = schedule_body(user_id, schedule_id=schedule_id, first_time=first_time, periodicity=3)
+            assert (await client.post("/schedule", json=body)).status_code == 200
+
+        pages = []
+        cursor = None
+        while True:
+            params = {"limit": 7} if cursor is None else {"limit": 7, "after": cursor}
+            page = (await client.get(f"/users/{user_id}/doses", params=params)).json()
+            pages.append(page["doses"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        doses = [dose for page in pages for dose in page]
+        assert all(len(page) == 7 for page in pages[:-1])
+        assert len({dose["id"] for dose in doses}) == len(doses)
+        # Порядок (dose_at, id), без пропусков и повторов на границе страниц
+        assert [(dose["time"], dose["id"]) for dose in doses] == sorted((dose["time"], dose["id"]) for dose in doses)
+        assert {dose["schedule_id"] for dose in doses} == {1, 2, 3}
+
+        invalid = await client.get(f"/users/{user_id}/doses", params={"after": "not-a-cursor"})
+        assert invalid.status_code == 400
+
+
+async def test_doses_page_bounds(app_client):
+    async with app_client() as client:
+        user_id = uuid.uuid4()
+        assert (await client.post("/schedule", json=schedule_body(user_id, duration_days=1))).status_code == 200
+
+        # Последняя страница без курсора; limit ограничен 1..1000
+        page = (await client.get(f"/users/{user_id}/doses", params={"limit": 1000})).json()
+        assert page["next_cursor"] is None
+        assert len(page["doses"]) > 0
+        for limit in (0, 1001):
+            assert (await client.get(f"/users/{user_id}/doses", params={"limit": limit})).status_code == 422
+
+        empty = (await client.get(f"/users/{uuid.uuid4()}/doses")).json()
+        assert empty == {"doses": [], "next_cursor": None}
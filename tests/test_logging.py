@@ -0,0 +1,80 @@
+import logging
+import sys
+import uuid
+from datetime import datetime, timezone
+
+import orjson
+import pytest
+
+from src.config import log
+from src.config.log import JsonFormatter, TextFormatter, log_payload
+
+USER_ID = uuid.UUID("00000000-0000-0000-0000-000000000001")
+
+
+def make_record(message="Schedule saved %s", args=(1,), exc_info=None, **extra) -> logging.LogRecord:
+    record = logging.LogRecord("app", logging.INFO, __file__, 1, message, args, exc_info)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_fields():
+    record = make_record(user_id=USER_ID, first_dose=datetime(2024, 3, 10, 9, 15, tzinfo=timezone.utc), doses=3)
+    entry = orjson.loads(JsonFormatter().format(record))
+
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "app"
+    assert entry["message"] == "Schedule saved 1"
+    assert entry["user_id"] == str(USER_ID)
+    assert entry["first_dose"] == "2024-03-10T09:15:00+00:00"
+    assert entry["doses"] == 3
+    assert "args" not in entry and "msg" not in entry
+
+
+def test_json_formatter_exception():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = make_record(exc_info=sys.exc_info())
+    entry = orjson.loads(JsonFormatter().format(record))
+    assert "ValueError: boom" in entry["exc_info"]
+
+
+def test_text_formatter_appends_extras():
+    formatter = TextFormatter("%(levelname)s %(name)s: %(message)s")
+    assert formatter.format(make_record()) == "INFO app: Schedule saved 1"
+    assert formatter.format(make_record(user_id=USER_ID, doses=3)) == \
+        f"INFO app: Schedule saved 1 user_id={USER_ID} doses=3"
+
+
+@pytest.fixture
+def payload_logger(monkeypatch, caplog):
+    monkeypatch.setattr(log, "_payload_max_chars", 20)
+    caplog.set_level(logging.DEBUG, logger="payload")
+    return logging.getLogger("payload")
+
+
+def test_log_payload_sampled_out(payload_logger, monkeypatch, caplog):
+    monkeypatch.setattr(log, "_payload_sample_rate", 0.0)
+    calls = []
+    log_payload(payload_logger, "payload", lambda: calls.append(1))
+    assert calls == []
+    assert caplog.records == []
+
+
+def test_log_payload_skipped_above_debug(payload_logger, monkeypatch, caplog):
+    monkeypatch.setattr(log, "_payload_sample_rate", 1.0)
+    payload_logger.setLevel(logging.INFO)
+    calls = []
+    log_payload(payload_logger, "payload", lambda: calls.append(1))
+    assert calls == []
+
+
+def test_log_payload_truncated(payload_logger, monkeypatch, caplog):
+    monkeypatch.setattr(log, "_payload_sample_rate", 1.0)
+    log_payload(payload_logger, "Generated schedule payload", lambda: list(range(100)), user_id=USER_ID)
+
+    record, = caplog.records
+    assert record.levelno == logging.DEBUG
+    assert record.user_id == USER_ID
+    assert record.payload == "[0,1,2,3,4,5,6,7,8,9...(truncated)"
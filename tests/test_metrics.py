@@ -0,0 +1,76 @@
+import uuid
+
+import pytest
+
+from src.repository.metrics import CONTENT_TYPE, CallbackGauge, Histogram, MetricsRegistry
+from tests.helpers import schedule_body
+
+SCHEDULE_COUNT = 'http_request_duration_seconds_count{method="POST",route="/schedule",status="200"}'
+DAY_COUNT = 'http_request_duration_seconds_count{method="GET",route="/schedule/{user_id}/day/{date}",status="200"}'
+
+
+def metric_values(text: str):
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            values[name] = float(value)
+    return values
+
+
+def test_histogram_exposition():
+    histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "/a")
+    histogram.observe(0.2, "/b")
+
+    lines = list(histogram.collect())
+    assert lines[:2] == ["# HELP latency_seconds Latency", "# TYPE latency_seconds histogram"]
+    values = metric_values("\n".join(lines))
+    # Корзины кумулятивные, граница le включается в корзину
+    assert values['latency_seconds_bucket{route="/a",le="0.1"}'] == 2
+    assert values['latency_seconds_bucket{route="/a",le="1.0"}'] == 3
+    assert values['latency_seconds_bucket{route="/a",le="+Inf"}'] == 4
+    assert values['latency_seconds_sum{route="/a"}'] == pytest.approx(3.65)
+    assert values['latency_seconds_count{route="/a"}'] == 4
+    assert values['latency_seconds_count{route="/b"}'] == 1
+
+
+def test_registry_renders_gauges():
+    registry = MetricsRegistry()
+    state = {"value": 1}
+    registry.register(CallbackGauge("pool_size", "Pool size", lambda: state["value"]))
+    state["value"] = 5
+    assert registry.render() == b"# HELP pool_size Pool size\n# TYPE pool_size gauge\npool_size 5\n"
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_counts_requests(app_client):
+    user_id = uuid.uuid4()
+    async with app_client() as client:
+        before = metric_values((await client.get("/metrics")).text)
+        assert (await client.post("/schedule", json=schedule_body(user_id))).status_code == 200
+        assert (await client.get(f"/schedule/{user_id}/day/2024-03-11")).status_code == 200
+
+        response = await client.get("/metrics")
+
+    assert response.headers["content-type"] == CONTENT_TYPE
+    after = metric_values(response.text)
+    # Маршрут - шаблон пути, а не путь с user_id
+    assert after[SCHEDULE_COUNT] == before.get(SCHEDULE_COUNT, 0) + 1
+    assert after[DAY_COUNT] == before.get(DAY_COUNT, 0) + 1
+    assert not any(str(user_id) in name for name in after)
+    for stage in ("generate", "save", "commit", "cache_invalidate"):
+        assert f'schedule_stage_duration_seconds_count{{stage="{stage}"}}' in after
+    assert "schedule_doses_generated_count" in after
+    assert "db_pool_connections_in_use" in after
+    assert "schedule_template_cache_misses" in after
+
+
+@pytest.mark.asyncio
+async def test_metrics_middleware_disabled(app_client):
+    async with app_client(METRICS_ENABLED=False) as client:
+        before = metric_values((await client.get("/metrics")).text)
+        assert (await client.post("/schedule", json=schedule_body(uuid.uuid4()))).status_code == 200
+        after = metric_values((await client.get("/metrics")).text)
+    assert after.get(SCHEDULE_COUNT, 0) == before.get(SCHEDULE_COUNT, 0)
@@ -0,0 +1,76 @@
+import threading
+import uuid
+from datetime import datetime
+
+import orjson
+import pytest
+
+from src.models import ScheduleCreate
+from src.repository.offload import GenerationPool, build_schedule_response
+from src.repository.utils import ScheduleGeneratorTimes
+from tests.helpers import schedule_body
+
+
+def make_schedule(periodicity: int, duration_days: int) -> ScheduleCreate:
+    return ScheduleCreate(first_time=datetime(2024, 3, 10, 9, 5), drug="aspirin", periodicity=periodicity,
+                          duration_days=duration_days, user_id=uuid.uuid4(), schedule_id=1)
+
+
+@pytest.mark.parametrize("periodicity, duration_days", [(1, 1), (1, 365), (3, 30), (13, 7), (14, 7), (24, 10)])
+def test_estimate_dose_count_is_upper_bound(periodicity, duration_days):
+    schedule = make_schedule(periodicity, duration_days)
+    estimate = ScheduleGeneratorTimes.estimate_dose_count(schedule)
+    assert len(ScheduleGeneratorTimes.generate_dose_series(schedule)) <= estimate <= duration_days * 24
+
+
+@pytest.mark.asyncio
+async def test_small_course_runs_inline():
+    pool = GenerationPool(threshold=1000, size=1, kind="thread")
+    series, payload = await pool.run(build_schedule_response, make_schedule(6, 30))
+    assert pool._executor is None
+    assert len(orjson.loads(payload)["schedule"]) == len(series)
+
+
+@pytest.mark.asyncio
+async def test_large_course_runs_in_pool():
+    threads = []
+
+    def generate(schedule):
+        threads.append(threading.current_thread())
+        return ScheduleGeneratorTimes.generate_dose_series(schedule)
+
+    pool = GenerationPool(threshold=1000, size=1, kind="thread")
+    try:
+        schedule = make_schedule(1, 365)
+        series = await pool.run(generate, schedule)
+        assert len(threads) == 1 and threads[0] is not threading.current_thread()
+        assert list(series.times()) == list(ScheduleGeneratorTimes.generate_dose_series(schedule).times())
+    finally:
+        pool.shutdown()
+    assert pool._executor is None
+
+
+@pytest.mark.asyncio
+async def test_process_pool_matches_inline():
+    pool = GenerationPool(threshold=1, size=1, kind="process")
+    try:
+        schedule = make_schedule(2, 400)
+        series, payload = await pool.run(build_schedule_response, schedule)
+    finally:
+        pool.shutdown()
+    # Результат передаётся из дочернего процесса через pickle и совпадает с генерацией на месте
+    expected_series, expected_payload = build_schedule_response(schedule)
+    assert payload == expected_payload
+    assert series.offsets == expected_series.offsets
+    assert series.last_day_times() == expected_series.last_day_times()
+
+
+@pytest.mark.asyncio
+async def test_offloaded_response_matches_inline(app_client):
+    async with app_client(GENERATION_OFFLOAD_THRESHOLD=10**9) as client:
+        inline = (await client.post("/schedule", json=schedule_body(uuid.uuid4(), duration_days=200))).json()
+    async with app_client(GENERATION_OFFLOAD_THRESHOLD=1) as client:
+        offloaded = (await client.post("/schedule", json=schedule_body(uuid.uuid4(), duration_days=200))).json()
+    # Ответы отличаются только пациентом
+    assert [dose["time"] for dose in offloaded["schedule"]] == [dose["time"] for dose in inline["schedule"]]
+    assert offloaded["last_day_times"] == inline["last_day_times"]
@@ -0,0 +1,67 @@
+import os
+import pstats
+import uuid
+
+import pytest
+
+from src.repository.profiling import rotate_profiles
+from tests.helpers import schedule_body
+
+
+def write_profile(directory, name: str, size: int, mtime: int):
+    path = directory / name
+    path.write_bytes(b"x" * size)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_rotate_profiles_by_count(tmp_path):
+    for index in range(5):
+        write_profile(tmp_path, f"{index}.prof", 10, 1000 + index)
+    (tmp_path / "notes.txt").write_text("not a profile")
+
+    rotate_profiles(str(tmp_path), max_files=2, max_bytes=10**6)
+
+    assert sorted(os.listdir(tmp_path)) == ["3.prof", "4.prof", "notes.txt"]
+
+
+def test_rotate_profiles_by_size(tmp_path):
+    write_profile(tmp_path, "old.prof", 60, 1000)
+    write_profile(tmp_path, "middle.prof", 30, 2000)
+    write_profile(tmp_path, "new.prof", 30, 3000)
+
+    rotate_profiles(str(tmp_path), max_files=10, max_bytes=70)
+
+    assert sorted(os.listdir(tmp_path)) == ["middle.prof", "new.prof"]
+
+
+@pytest.mark.asyncio
+async def test_profiling_by_header(app_client, tmp_path):
+    directory = tmp_path / "profiles"
+    async with app_client(PROFILING_ENABLED=True, PROFILING_DIR=str(directory)) as client:
+        plain = await client.post("/schedule", json=schedule_body(uuid.uuid4()))
+        assert "x-profile-id" not in plain.headers
+        assert not directory.exists()
+
+        profiled = await client.post("/schedule", json=schedule_body(uuid.uuid4()), headers={"X-Profile": "1"})
+
+    assert profiled.status_code == 200
+    profile_id = profiled.headers["x-profile-id"]
+    assert "-POST-schedule-" in profile_id
+    assert os.listdir(directory) == [f"{profile_id}.prof"]
+    # Профиль читается pstats и содержит обработчик запроса
+    stats = pstats.Stats(str(directory / f"{profile_id}.prof"))
+    assert any(function == "create_schedule" for _, _, function in stats.stats)
+
+
+@pytest.mark.asyncio
+async def test_profiling_sampled_with_rotation(app_client, tmp_path):
+    directory = tmp_path / "profiles"
+    async with app_client(PROFILING_ENABLED=True, PROFILING_DIR=str(directory), PROFILING_SAMPLE_RATE=1.0,
+                          PROFILING_MAX_FILES=2) as client:
+        responses = [await client.get("/cache/templates") for _ in range(3)]
+
+    assert all("x-profile-id" in response.headers for response in responses)
+    saved = {f"{response.headers['x-profile-id']}.prof" for response in responses}
+    remaining = os.listdir(directory)
+    assert len(remaining) == 2 and set(remaining) <= saved
@@ -0,0 +1,86 @@
+import uuid
+
+import pytest
+from sqlalchemy import event, select
+
+from src.DB.ORM_models import DoseOrm
+from src.models import ScheduleCreate
+from src.repository.repository import TaskRepository
+from src.repository.utils import ScheduleGeneratorTimes
+from tests.helpers import running_app, schedule_body
+
+
+def make_item(user_id, schedule_id: int = 1, **fields):
+    schedule = ScheduleCreate(**schedule_body(user_id, schedule_id, **fields))
+    return schedule, ScheduleGeneratorTimes.generate_dose_series(schedule)
+
+
+def test_iter_dose_rows_match_series():
+    schedule, series = make_item(uuid.uuid4())
+    rows = list(TaskRepository.iter_dose_rows(42, schedule, series))
+    assert [row["dose_at"] for row in rows] == list(series.times())
+    assert {(row["user_id"], row["schedule_id"], row["drug"]) for row in rows} == {(schedule.user_id, 42, "aspirin")}
+
+
+@pytest.mark.asyncio
+async def test_doses_inserted_in_chunks(settings, monkeypatch):
+    monkeypatch.setattr(TaskRepository, "DOSE_INSERT_CHUNK", 7)
+    user_id = uuid.uuid4()
+    # Порции не привязаны к назначениям: граница порции проходит внутри курса
+    items = [make_item(user_id, 1), make_item(user_id, 2, periodicity=5, duration_days=3), make_item(uuid.uuid4())]
+    total = sum(len(series) for _, series in items)
+
+    async with running_app(settings) as app:
+        async with app.state.session_factory() as session:
+            repository = TaskRepository(session)
+            _, prescription_ids = await repository.insert_schedules(items)
+            chunks = [len(rows) async for rows in repository.insert_dose_chunks(items, prescription_ids)]
+            await session.commit()
+
+        assert chunks == [7] * (total // 7) + ([total % 7] if total % 7 else [])
+
+        async with app.state.session_factory() as session:
+            stored = (await session.execute(select(DoseOrm.schedule_id, DoseOrm.dose_at)
+                                            .order_by(DoseOrm.id))).all()
+    expected = [(prescription_id, dose_at) for prescription_id, (_, series) in zip(prescription_ids, items)
+                for dose_at in series.times()]
+    assert [(schedule_id, dose_at.replace(tzinfo=None)) for schedule_id, dose_at in stored] == \
+        [(schedule_id, dose_at.replace(tzinfo=None)) for schedule_id, dose_at in expected]
+
+
+@pytest.mark.asyncio
+async def test_touch_users_upsert(settings):
+    user_id, other_user_id = uuid.uuid4(), uuid.uuid4()
+    async with running_app(settings) as app:
+        async with app.state.session_factory() as session:
+            repository = TaskRepository(session)
+            assert await repository.touch_users([user_id, user_id]) == {user_id: 1}
+            assert await repository.touch_users([user_id, other_user_id]) == {user_id: 2, other_user_id: 1}
+            await session.commit()
+
+            revision, _ = await repository.get_user_version(user_id)
+            assert revision == 2
+
+
+@pytest.mark.asyncio
+async def test_touch_users_rows_sorted_by_user_id(settings):
+    # Порядок строк VALUES не зависит от хэшей: пакеты блокируют пользователей в одном порядке
+    user_ids = [uuid.uuid4() for _ in range(20)]
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("INSERT INTO USERS"):
+            statements.append(parameters)
+
+    async with running_app(settings) as app:
+        async with app.state.session_factory() as session:
+            engine = session.bind.sync_engine
+            event.listen(engine, "before_cursor_execute", capture)
+            try:
+                await TaskRepository(session).touch_users(user_ids + user_ids[::2])
+            finally:
+                event.remove(engine, "before_cursor_execute", capture)
+
+    parameters, = statements
+    inserted = [parameter for parameter in parameters if parameter in {user_id.hex for user_id in user_ids}]
+    assert inserted == sorted(user_id.hex for user_id in user_ids)
@@ -0,0 +1,127 @@
+import uuid
+from datetime import datetime, timezone
+
+import orjson
+import pytest
+
+from src.models import ScheduleCreate
+from src.repository.repository import TaskRepository
+from src.repository.utils import ScheduleGeneratorTimes
+from tests.helpers import client_for, running_app, schedule_body
+
+pytestmark = pytest.mark.asyncio
+
+
+def expected_times(body):
+    series = ScheduleGeneratorTimes.generate_dose_series(ScheduleCreate(**body))
+    return [dose_time.isoformat() for dose_time in series.times()]
+
+
+async def test_create_schedule(app_client):
+    async with app_client() as client:
+        body = schedule_body(uuid.uuid4())
+
+        response = await client.post("/schedule", json=body)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [dose["time"] for dose in data["schedule"]] == expected_times(body)
+        assert {dose["drug_name"] for dose in data["schedule"]} == {"aspirin"}
+        assert len(data["last_day_times"]) == 5
+
+
+async def test_same_schedule_id_for_different_users(app_client):
+    async with app_client() as client:
+        first = await client.post("/schedule", json=schedule_body(uuid.uuid4(), schedule_id=7))
+        second = await client.post("/schedule", json=schedule_body(uuid.uuid4(), schedule_id=7))
+
+        assert first.status_code == 200
+        assert second.status_code == 200
+
+
+async def test_duplicate_schedule_id_conflict(app_client):
+    async with app_client() as client:
+        user_id = uuid.uuid4()
+        assert (await client.post("/schedule", json=schedule_body(user_id))).status_code == 200
+
+        response = await client.post("/schedule", json=schedule_body(user_id, drug="other"))
+
+        assert response.status_code == 409
+        # Повтор не изменил ни назначение, ни версию расписания
+        schedules = (await client.get("/schedules", params={"user_id": str(user_id)}))
+        assert [schedule["drug"] for schedule in schedules.json()["schedules"]] == ["aspirin"]
+        assert schedules.headers["etag"] == '"1"'
+
+
+async def test_read_endpoints_match_created_schedule(app_client):
+    async with app_client() as client:
+        user_id = uuid.uuid4()
+        body = schedule_body(user_id, first_time="2024-03-10T09:05:00+03:00", duration_days=3)
+        created = (await client.post("/schedule", json=body)).json()["schedule"]
+        times = [dose["time"] for dose in created]
+        assert times[0] == "2024-03-10T09:15:00+00:00"
+
+        day = await client.get(f"/schedule/{user_id}/day/2024-03-11")
+        day_times = [time for time in times if time.startswith("2024-03-11")]
+        assert [dose["time"] for dose in day.json()["schedule"]] == day_times
+
+        stream = await client.get(f"/schedule/{user_id}/stream",
+                                  params={"start": "2024-03-10T00:00:00Z", "end": "2024-03-20T00:00:00Z"})
+        assert [orjson.loads(line)["time"] for line in stream.text.splitlines()] == times
+
+        schedule = await client.get("/schedule", params={"user_id": str(user_id), "schedule_id": 1})
+        assert schedule.status_code == 200
+        assert [datetime.fromisoformat(time) for time in schedule.json()["schedule"]["scheduled_times"]] == \
+            [datetime.fromisoformat(time).replace(tzinfo=None) for time in times]
+
+
+async def test_day_schedule_merges_prescriptions(app_client):
+    async with app_client() as client:
+        user_id = uuid.uuid4()
+        first = schedule_body(user_id, schedule_id=1, duration_days=3)
+        second = schedule_body(user_id, schedule_id=2, drug="other", first_time="2024-03-11T10:20:00", periodicity=4)
+        for body in (first, second):
+            assert (await client.post("/schedule", json=body)).status_code == 200
+
+        day = (await client.get(f"/schedule/{user_id}/day/2024-03-11")).json()
+        expected = sorted(time for body in (first, second) for time in expected_times(body)
+                          if time.startswith("2024-03-11"))
+        assert [dose["time"] for dose in day["schedule"]] == expected
+        assert {dose["drug_name"] for dose in day["schedule"]} == {"aspirin", "other"}
+
+        # День после окончания курсов
+        assert (await client.get(f"/schedule/{user_id}/day/2024-04-01")).json()["schedule"] == []
+
+
+async def test_stream_window_with_offset_bounds(app_client):
+    async with app_client() as client:
+        user_id = uuid.uuid4()
+        body = schedule_body(user_id, periodicity=3, duration_days=5)
+        times = [dose["time"] for dose in (await client.post("/schedule", json=body)).json()["schedule"]]
+
+        # 00:30+05:00 - это 10 марта 19:30 UTC: приём 10 марта в 21:15 UTC входит в окно
+        stream = await client.get(f"/schedule/{user_id}/stream",
+                                  params={"start": "2024-03-11T00:30:00+05:00", "end": "2024-03-11T09:00:00+00:00"})
+        assert [orjson.loads(line)["time"] for line in stream.text.splitlines()] == \
+            [time for time in times if "2024-03-10T19:30:00+00:00" <= time < "2024-03-11T09:00:00+00:00"]
+        assert "2024-03-10T21:15:00+00:00" in stream.text
+
+
+async def test_next_takings_unknown_user(app_client):
+    async with app_client() as client:
+        response = await client.get("/next_takings", params={"user_id": str(uuid.uuid4())})
+        assert response.status_code == 404
+
+
+async def test_utc_offset_is_stored(settings):
+    user_id = uuid.uuid4()
+    async with running_app(settings) as app:
+        async with client_for(app) as client:
+            body = schedule_body(user_id, first_time="2024-03-10T09:05:00-04:30")
+            assert (await client.post("/schedule", json=body)).status_code == 200
+
+        async with app.state.session_factory() as session:
+            prescription, = await TaskRepository(session).get_existing_schedule(user_id)
+            assert prescription.utc_offset_minutes == -270
+            assert ScheduleGeneratorTimes.wall_clock(prescription.first_time) == \
+                datetime(2024, 3, 10, 9, 5, tzinfo=timezone.utc)
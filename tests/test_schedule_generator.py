@@ -0,0 +1,209 @@
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from itertools import islice, product
+from types import SimpleNamespace
+
+import pytest
+
+from src.models import ScheduleCreate
+from src.repository.serialization import decode_cursor, encode_cursor
+from src.repository.utils import ScheduleGeneratorTimes, to_utc
+from tests.baseline_generator import ScheduleGeneratorTimes as BaselineGenerator
+
+USER_ID = uuid.UUID("00000000-0000-0000-0000-000000000001")
+
+
+def make_schedule(first_time: datetime, periodicity: int, duration_days, drug: str = "aspirin",
+                  utc_offset_minutes: int = 0):
+    return SimpleNamespace(first_time=first_time, drug=drug, periodicity=periodicity,
+                           duration_days=duration_days, user_id=USER_ID, utc_offset_minutes=utc_offset_minutes)
+
+
+def course_times(schedule):
+    return list(ScheduleGeneratorTimes.generate_dose_series(schedule).times())
+
+
+@pytest.mark.parametrize("periodicity", [1, 2, 3, 5, 7, 8, 13, 24, 30])
+@pytest.mark.parametrize("duration_days", [None, 0, 1, 2, 3, 5, 40])
+def test_generate_scheduled_times_matches_baseline(periodicity, duration_days):
+    for hour, minute in product(range(24), [0, 7, 15, 20, 44, 50]):
+        schedule = make_schedule(datetime(2024, 3, 10, hour, minute, 33), periodicity, duration_days)
+
+        expected = BaselineGenerator.generate_scheduled_times(schedule)
+        actual = ScheduleGeneratorTimes.generate_scheduled_times(schedule)
+
+        assert actual == expected, (hour, minute)
+        # Совпадает и представление: смещение UTC, которое попадает в JSON
+        assert [dose["time"].isoformat() for dose in actual[0]] == [dose["time"].isoformat() for dose in expected[0]]
+
+
+def test_long_course_matches_baseline():
+    schedule = make_schedule(datetime(2024, 3, 10, 5, 3), 1, 3650)
+    assert ScheduleGeneratorTimes.generate_scheduled_times(schedule) == \
+        BaselineGenerator.generate_scheduled_times(schedule)
+
+
+@pytest.mark.parametrize("first_minute, step, expected_start", [
+    (9 * 60 + 15, 180, 9 * 60 + 15),   # внутри окна - с момента первого приёма
+    (8 * 60, 60, 8 * 60),              # ровно начало окна
+    (5 * 60 + 15, 180, 8 * 60 + 15),   # ночные приёмы пропускаются целыми периодами
+    (2 * 60 + 30, 300, 12 * 60 + 30),  # 02:30 + 5ч = 07:30 - ещё ночь, следующий 12:30
+    (7 * 60 + 59, 1440, 31 * 60 + 59),  # следующий приём - уже на другие сутки
+])
+def test_first_day_offsets(first_minute, step, expected_start):
+    offsets = ScheduleGeneratorTimes.first_day_offsets(first_minute, step)
+    assert offsets.step == step
+    assert offsets.stop == 22 * 60
+    if expected_start < 22 * 60:
+        assert offsets[0] == expected_start
+    else:
+        assert not offsets
+
+
+def test_first_day_offsets_after_window_is_empty():
+    assert not ScheduleGeneratorTimes.first_day_offsets(22 * 60 + 15, 60)
+
+
+@pytest.mark.parametrize("first_time, periodicity, duration_days", [
+    (datetime(2024, 3, 10, 9, 5), 6, 5),
+    (datetime(2024, 3, 10, 5, 40), 3, 4),
+    (datetime(2024, 3, 10, 23, 50), 2, 3),
+    (datetime(2024, 12, 30, 14, 0), 7, 6),
+])
+def test_generate_day_times_matches_course(first_time, periodicity, duration_days):
+    schedule = make_schedule(first_time, periodicity, duration_days)
+    times = course_times(schedule)
+
+    day = first_time.date() - timedelta(days=1)
+    for _ in range(duration_days + 3):
+        expected = [dose_time for dose_time in times if dose_time.date() == day]
+        assert ScheduleGeneratorTimes.generate_day_times(schedule, day) == expected, day
+        day += timedelta(days=1)
+
+
+def test_generate_day_times_continuous_course():
+    schedule = make_schedule(datetime(2024, 3, 10, 9, 5), 4, None)
+    times = ScheduleGeneratorTimes.generate_day_times(schedule, date(2030, 1, 1))
+    assert times[0] == datetime(2030, 1, 1, 8, 15, tzinfo=timezone.utc)
+    assert times[-1] == datetime(2030, 1, 1, 20, 15, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("start, end", [
+    (datetime(2024, 3, 1), datetime(2024, 4, 1)),
+    (datetime(2024, 3, 11, 12, 0), datetime(2024, 3, 13, 9, 0)),
+    (datetime(2024, 3, 11, 8, 15), datetime(2024, 3, 11, 8, 16)),   # start совпадает с приёмом
+    (datetime(2024, 3, 11, 8, 16), datetime(2024, 3, 11, 14, 15)),  # end не включается
+    (datetime(2024, 3, 12, 22, 0), datetime(2024, 3, 13, 8, 0)),    # ночь без приёмов
+    (datetime(2024, 3, 11, 12, 0, tzinfo=timezone.utc), None),
+    # Границы с часовым поясом: дни окна считаются по UTC
+    (datetime(2024, 3, 11, 0, 30, tzinfo=timezone(timedelta(hours=5))), None),
+    (datetime(2024, 3, 10, 0, 0), datetime(2024, 3, 10, 20, 0, tzinfo=timezone(timedelta(hours=-14)))),
+    (datetime(2024, 3, 11, 23, 0, tzinfo=timezone(timedelta(hours=-3))),
+     datetime(2024, 3, 12, 12, 0, tzinfo=timezone(timedelta(hours=9, minutes=30)))),
+])
+def test_iter_scheduled_times_window(start, end):
+    schedule = make_schedule(datetime(2024, 3, 10, 9, 5), 3, 5)
+    aware_start = to_utc(start)
+    aware_end = to_utc(end) if end is not None else None
+    expected = [dose_time for dose_time in course_times(schedule)
+                if dose_time >= aware_start and (aware_end is None or dose_time < aware_end)]
+
+    doses = list(ScheduleGeneratorTimes.iter_scheduled_times(schedule, start, end))
+
+    assert [dose["time"] for dose in doses] == expected
+    assert all(dose["drug_name"] == "aspirin" and dose["user_id"] == USER_ID for dose in doses)
+
+
+def test_iter_scheduled_times_continuous_course_is_lazy():
+    schedule = make_schedule(datetime(2024, 3, 10, 9, 5), 6, None)
+    start = datetime(2050, 6, 1, 15, 0, tzinfo=timezone.utc)
+    doses = list(islice(ScheduleGeneratorTimes.iter_scheduled_times(schedule, start), 4))
+    assert [dose["time"] for dose in doses] == [
+        datetime(2050, 6, 1, 20, 15, tzinfo=timezone.utc),
+        datetime(2050, 6, 2, 8, 15, tzinfo=timezone.utc),
+        datetime(2050, 6, 2, 14, 15, tzinfo=timezone.utc),
+        datetime(2050, 6, 2, 20, 15, tzinfo=timezone.utc),
+    ]
+
+
+def test_next_takings_merges_prescriptions():
+    schedules = [make_schedule(datetime(2024, 3, 10, 9, 5), 6, 5, "a"),
+                 make_schedule(datetime(2024, 3, 10, 10, 20), 4, 5, "b")]
+    after = datetime(2024, 3, 11, 12, 0, tzinfo=timezone.utc)
+    expected = sorted(
+        (dose for schedule in schedules for dose in ScheduleGeneratorTimes.generate_scheduled_times(schedule)[0]
+         if dose["time"] >= after),
+        key=lambda dose: dose["time"],
+    )[:5]
+    assert ScheduleGeneratorTimes.next_takings(schedules, after, 5) == expected
+
+
+@pytest.mark.parametrize("first_time, now, expected", [
+    # 06:00 UTC - 09:00 у пациента на +03:00: приём в 08:15 уже прошёл
+    ("2024-03-10T09:05:00+03:00", datetime(2024, 3, 11, 6, 0, tzinfo=timezone.utc), datetime(2024, 3, 11, 14, 15)),
+    # 12:00 UTC - 07:00 у пациента на -05:00: ближайший приём 08:15 ещё впереди
+    ("2024-03-10T09:05:00-05:00", datetime(2024, 3, 11, 12, 0, tzinfo=timezone.utc), datetime(2024, 3, 11, 8, 15)),
+    ("2024-03-10T09:05:00", datetime(2024, 3, 11, 12, 0, tzinfo=timezone.utc), datetime(2024, 3, 11, 14, 15)),
+])
+def test_next_takings_uses_patient_wall_clock(first_time, now, expected):
+    schedule = ScheduleCreate(first_time=first_time, drug="aspirin", periodicity=6, duration_days=5,
+                              user_id=USER_ID, schedule_id=1)
+    takings = ScheduleGeneratorTimes.next_takings([schedule], now, 1)
+    assert takings[0]["time"] == expected.replace(tzinfo=timezone.utc)
+
+
+def test_first_time_offset_is_wall_clock():
+    # 09:05+03:00 - приём в 09:15 по часам пациента; сохраняется 09:05 UTC, и чтение даёт те же приёмы
+    schedule = ScheduleCreate(first_time="2024-03-10T09:05:00+03:00", drug="aspirin", periodicity=6,
+                              duration_days=3, user_id=USER_ID, schedule_id=1)
+    assert schedule.first_time == datetime(2024, 3, 10, 9, 5, tzinfo=timezone.utc)
+    assert schedule.utc_offset_minutes == 180
+    assert ScheduleGeneratorTimes.wall_clock(schedule.first_time) == schedule.first_time
+
+    times = course_times(schedule)
+    assert times == course_times(make_schedule(datetime(2024, 3, 10, 9, 5), 6, 3))
+    assert times[0] == datetime(2024, 3, 10, 9, 15, tzinfo=timezone.utc)
+    assert ScheduleGeneratorTimes.generate_day_times(schedule, date(2024, 3, 10))[0] == times[0]
+
+
+def test_template_cache_counters():
+    ScheduleGeneratorTimes.cached_course_template.cache_clear()
+    schedule = make_schedule(datetime(2024, 3, 10, 9, 5), 6, 30)
+
+    first = ScheduleGeneratorTimes.generate_dose_series(schedule)
+    second = ScheduleGeneratorTimes.generate_dose_series(make_schedule(datetime(2025, 1, 2, 9, 10), 6, 30, "other"))
+
+    # Тот же шаблон для другой даты и лекарства: промах, затем попадание
+    assert second.offsets is first.offsets
+    info = ScheduleGeneratorTimes.template_cache_info()
+    assert (info["hits"], info["misses"], info["size"]) == (1, 1, 1)
+
+
+def test_long_course_template_is_not_cached(monkeypatch):
+    ScheduleGeneratorTimes.cached_course_template.cache_clear()
+    monkeypatch.setattr(ScheduleGeneratorTimes, "TEMPLATE_CACHE_MAX_DOSES", 100)
+    long_course = make_schedule(datetime(2024, 3, 10, 9, 5), 1, 30)
+
+    first = ScheduleGeneratorTimes.generate_dose_series(long_course)
+    second = ScheduleGeneratorTimes.generate_dose_series(long_course)
+
+    assert second.offsets is not first.offsets
+    assert second.offsets == first.offsets
+    assert course_times(long_course) == list(first.times())
+    info = ScheduleGeneratorTimes.template_cache_info()
+    assert (info["hits"], info["misses"], info["size"]) == (0, 0, 0)
+
+    # Короткий курс по-прежнему кэшируется
+    ScheduleGeneratorTimes.generate_dose_series(make_schedule(datetime(2024, 3, 10, 9, 5), 6, 3))
+    assert ScheduleGeneratorTimes.template_cache_info()["misses"] == 1
+
+
+def test_cursor_round_trip():
+    dose_at = datetime(2024, 3, 10, 9, 15, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor(dose_at, 42)) == (dose_at, 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", encode_cursor(datetime(2024, 1, 1), 1)[:-3]])
+def test_cursor_invalid(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+import uvicorn
+
+from src import server
+from src.config.config import get_settings
+from tests.helpers import PROJECT_DIR
+
+
+def test_help_without_db_settings():
+    env = {name: value for name, value in os.environ.items() if not name.startswith("DB_")}
+    result = subprocess.run([sys.executable, "-m", "src.server", "--help"], cwd=PROJECT_DIR, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert "--workers" in result.stdout
+
+
+def run_main(monkeypatch, argv, **env):
+    calls = []
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    get_settings.cache_clear()
+    monkeypatch.setattr(server, "setup_logging", lambda settings: None)
+    monkeypatch.setattr(uvicorn, "run", lambda app, **options: calls.append(options))
+    try:
+        server.main(argv)
+    finally:
+        get_settings.cache_clear()
+    options, = calls
+    return options
+
+
+def test_arguments_override_settings(monkeypatch):
+    options = run_main(monkeypatch, ["--port", "9000", "--workers", "3"], SERVER_HOST="0.0.0.0", SERVER_PORT="8100")
+    assert (options["host"], options["port"], options["workers"]) == ("0.0.0.0", 9000, 3)
+
+
+def test_settings_are_defaults(monkeypatch):
+    options = run_main(monkeypatch, [], SERVER_PORT="8100", SERVER_WORKERS="2")
+    assert (options["host"], options["port"], options["workers"]) == ("127.0.0.1", 8100, 2)
@@ -0,0 +1,85 @@
+import uuid
+
+import orjson
+import pytest
+from sqlalchemy import func, select
+
+from main import stream_created_schedule
+from src.DB.ORM_models import DoseOrm
+from src.models import ScheduleCreate
+from src.repository.repository import TaskRepository
+from src.repository.utils import ScheduleGeneratorTimes
+from tests.helpers import running_app, schedule_body
+
+pytestmark = pytest.mark.asyncio
+
+NDJSON = {"Accept": "application/x-ndjson"}
+
+
+def expected_times(body):
+    series = ScheduleGeneratorTimes.generate_dose_series(ScheduleCreate(**body))
+    return [dose_time.isoformat() for dose_time in series.times()]
+
+
+async def count_doses(session_factory, user_id) -> int:
+    async with session_factory() as session:
+        return await session.scalar(select(func.count()).select_from(DoseOrm).where(DoseOrm.user_id == user_id))
+
+
+async def test_create_schedule_ndjson(app_client):
+    async with app_client() as client:
+        body = schedule_body(uuid.uuid4())
+
+        response = await client.post("/schedule", json=body, headers=NDJSON)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        *doses, status = [orjson.loads(line) for line in response.text.splitlines()]
+        assert [dose["time"] for dose in doses] == expected_times(body)
+        assert status == {"status": "saved", "schedule_id": 1, "doses": len(doses)}
+
+        schedules = await client.get("/schedules", params={"user_id": body["user_id"]})
+        assert schedules.status_code == 200
+
+
+async def test_ndjson_conflict_before_stream(app_client):
+    async with app_client() as client:
+        body = schedule_body(uuid.uuid4())
+        assert (await client.post("/schedule", json=body)).status_code == 200
+
+        response = await client.post("/schedule", json=body, headers=NDJSON)
+        assert response.status_code == 409
+
+
+async def test_stream_emits_chunks_before_commit(settings, monkeypatch):
+    monkeypatch.setattr(TaskRepository, "DOSE_INSERT_CHUNK", 4)
+    schedule = ScheduleCreate(**schedule_body(uuid.uuid4()))
+    series = ScheduleGeneratorTimes.generate_dose_series(schedule)
+
+    async with running_app(settings) as app:
+        stream = stream_created_schedule(app.state.session_factory, app.state.schedule_cache, schedule, series)
+        first = [orjson.loads(await anext(stream)) for _ in range(4)]
+        # Первая порция уже у клиента, а транзакция ещё не зафиксирована
+        assert [dose["time"] for dose in first] == [dose_time.isoformat() for dose_time in list(series.times())[:4]]
+        assert await count_doses(app.state.session_factory, schedule.user_id) == 0
+
+        rest = [orjson.loads(line) async for line in stream]
+        assert rest[-1] == {"status": "saved", "schedule_id": 1, "doses": len(series)}
+        assert len(first) + len(rest) - 1 == len(series)
+        assert await count_doses(app.state.session_factory, schedule.user_id) == len(series)
+
+
+async def test_stream_reports_concurrent_conflict(settings):
+    schedule = ScheduleCreate(**schedule_body(uuid.uuid4()))
+    series = ScheduleGeneratorTimes.generate_dose_series(schedule)
+
+    async with running_app(settings) as app:
+        saved = [line async for line in stream_created_schedule(app.state.session_factory, app.state.schedule_cache,
+                                                        schedule, series)]
+        assert orjson.loads(saved[-1])["status"] == "saved"
+
+        # Тот же schedule_id вставлен после проверки в обработчике: ошибка приходит итоговой строкой
+        lines = [orjson.loads(line) async for line in stream_created_schedule(app.state.session_factory,
+                                                                      app.state.schedule_cache, schedule, series)]
+        assert lines == [{"status": "error", "schedule_id": 1, "detail": "Schedule already exists"}]
+        assert await count_doses(app.state.session_factory, schedule.user_id) == len(series)
@@ -0,0 +1,74 @@
+import uuid
+
+import pytest
+
+from tests.helpers import client_for, running_app, schedule_body, wait_for_status
+
+pytestmark = pytest.mark.asyncio
+
+
+class FailingCacheBackend:
+    # Кэш недоступен: чтение промахивается, сброс падает
+    def __init__(self):
+        self.deletes = 0
+
+    async def get(self, key):
+        return None
+
+    async def set(self, key, value, ttl):
+        pass
+
+    async def delete(self, key):
+        self.deletes += 1
+        raise ConnectionError("cache is down")
+
+
+async def test_write_behind_statuses(app_client):
+    user_id, other_user_id = uuid.uuid4(), uuid.uuid4()
+    async with app_client(WRITE_BEHIND_ENABLED=True) as client:
+        responses = [await client.post("/schedule", json=schedule_body(owner))
+                     for owner in (user_id, other_user_id, user_id)]
+        assert [response.status_code for response in responses] == [202, 202, 202]
+        assert len({response.json()["status_id"] for response in responses}) == 3
+
+        # Статусы по status_id: одинаковый schedule_id у разных пациентов не смешивается,
+        # повтор schedule_id у того же пациента не сохраняется
+        statuses = [await wait_for_status(client, response.json()["status_url"]) for response in responses]
+        assert statuses == ["saved", "saved", "failed"]
+
+        unknown = await client.get("/schedule/status/unknown")
+        assert unknown.status_code == 404
+        # Статус из другого процесса: БД проверяется по (user_id, schedule_id) из status_url
+        saved = await client.get("/schedule/status/unknown", params={"user_id": str(other_user_id), "schedule_id": 1})
+        assert saved.json()["status"] == "saved"
+
+
+async def test_write_behind_cache_failure_keeps_saved_status(settings):
+    backend = FailingCacheBackend()
+    async with running_app(settings.model_copy(update={"WRITE_BEHIND_ENABLED": True})) as app:
+        app.state.schedule_cache.backend = backend
+        async with client_for(app) as client:
+            responses = [await client.post("/schedule", json=schedule_body(uuid.uuid4())) for _ in range(3)]
+            statuses = [await wait_for_status(client, response.json()["status_url"]) for response in responses]
+
+    # Зафиксированная пачка не повторяется и не помечается failed из-за кэша
+    assert statuses == ["saved", "saved", "saved"]
+    assert backend.deletes == 3
+
+
+async def test_cache_failure_after_commit_is_not_an_error(settings):
+    user_id = uuid.uuid4()
+    async with running_app(settings) as app:
+        app.state.schedule_cache.backend = FailingCacheBackend()
+        async with client_for(app) as client:
+            created = await client.post("/schedule", json=schedule_body(user_id))
+            assert created.status_code == 200
+
+            bulk = await client.post("/schedules/bulk", json=[schedule_body(user_id, 2), schedule_body(uuid.uuid4())])
+            assert bulk.status_code == 200
+            assert [result["status"] for result in bulk.json()["results"]] == ["created", "created"]
+
+            # Повтор того же назначения - настоящий конфликт, а не следствие ошибки кэша
+            assert (await client.post("/schedule", json=schedule_body(user_id))).status_code == 409
+            schedules = await client.get("/schedules", params={"user_id": str(user_id)})
+            assert len(schedules.json()) == 2